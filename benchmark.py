@@ -0,0 +1,332 @@
+"""
+Load and latency benchmark for the Dialogflow webhook
+
+Replays recorded Dialogflow webhook payloads (JSONL, one WebhookRequest per
+line) or synthetic traffic for each intent, either in-process through the
+Flask test client or over HTTP against a running server (e.g. gunicorn).
+In-process runs use a local SQLite stand-in seeded from init_database.sql,
+so no MySQL server is needed.
+
+Usage:
+    python benchmark.py                                   # in-process, synthetic traffic
+    python benchmark.py --replay recorded.jsonl --concurrency 16
+    python benchmark.py --seed-only --sqlite bench.sqlite3
+    DB_BACKEND=sqlite SQLITE_PATH=bench.sqlite3 gunicorn -c gunicorn.conf.py -w 4 --threads 8 -b 127.0.0.1:8000 wsgi:app
+    python benchmark.py --url http://127.0.0.1:8000/webhook --concurrency 64
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+PROGRAMS = ['Computer Science', 'Software Engineering', 'Information Technology']
+YEARS = [1, 2, 3, 4]
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+DAY_QUERIES = ['today', 'tomorrow', 'this week', 'monday to wednesday'] + WEEKDAYS
+COURSE_INPUTS = ['Databases', 'db', 'forensics', 'Digital Forensics', 'DCSP', 'cloud', 'distributed']
+SESSION = 'projects/uni-bot/agent/sessions/bench-{}'
+
+# Relative frequency of each intent in synthetic traffic
+INTENT_MIX = {
+    'Schedule.Query': 40,
+    'Schedule.Query.ProvideProgram': 5,
+    'Schedule.Query.ProvideYear': 10,
+    'Schedule.Query.Complete': 10,
+    'Resources.Query': 20,
+    'Resources.ProvideCourse': 5,
+    'Resources.ProvideWeek': 10,
+    'Resources.More': 3,
+}
+
+ERROR_PREFIXES = ("Sorry, I encountered an error", "Sorry, that's taking longer")
+
+def seed_sqlite(path, sql_file='init_database.sql'):
+    """Create a SQLite stand-in with the course data and a synthetic timetable"""
+    from sqlite_database import load_sql_file
+
+    load_sql_file(path, sql_file)
+    connection = sqlite3.connect(path)
+    try:
+        if connection.execute("SELECT COUNT(*) FROM lectures").fetchone()[0] == 0:
+            rows = []
+            for program in PROGRAMS:
+                for year in YEARS:
+                    for day_index, weekday in enumerate(WEEKDAYS):
+                        for slot in range(3):
+                            hour = 9 + slot * 2 + day_index % 2
+                            rows.append((
+                                program, year, weekday, f"CS{year}{day_index}{slot}",
+                                f"Module {year}.{day_index}.{slot}",
+                                f"{hour:02d}:00:00", f"{hour + 1:02d}:00:00",
+                                f"MC{100 + slot}", f"Topic {slot + 1}",
+                            ))
+            connection.executemany(
+                "INSERT INTO lectures (program, year_level, weekday, course_code, title, "
+                "start_time, end_time, venue, topic) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+def _context(session, name, parameters=None):
+    return {'name': f"{session}/contexts/{name}", 'lifespanCount': 5, 'parameters': parameters or {}}
+
+def _payload(session, intent, action, parameters, contexts):
+    return {
+        'session': session,
+        'queryResult': {
+            'intent': {'displayName': intent},
+            'action': action,
+            'parameters': parameters,
+            'outputContexts': contexts,
+        },
+    }
+
+def synthetic_payload(intent, rng):
+    """Build a realistic Dialogflow WebhookRequest for `intent`"""
+    session = SESSION.format(rng.randrange(10 ** 6))
+    program = rng.choice(PROGRAMS)
+    year = rng.choice(YEARS)
+    day_query = rng.choice(DAY_QUERIES)
+    course = rng.choice(COURSE_INPUTS)
+    week = rng.choice([1, 2, 3, 4])
+    base = [_context(session, '__system_counters__')]
+
+    if intent in ('Schedule.Query', 'Schedule.Query.Complete'):
+        action = 'query.schedule' if intent == 'Schedule.Query' else 'query.complete'
+        return _payload(session, intent, action,
+                        {'program': program, 'year_level': str(year), 'day_query': day_query}, base)
+    if intent == 'Schedule.Query.ProvideProgram':
+        return _payload(session, intent, 'provide.program', {'program': program},
+                        [_context(session, 'awaiting-program', {'day_query': day_query})])
+    if intent == 'Schedule.Query.ProvideYear':
+        return _payload(session, intent, 'provide.year', {'year_level': str(year)},
+                        [_context(session, 'awaiting-year', {'program': program, 'day_query': day_query})])
+    if intent == 'Resources.Query':
+        return _payload(session, intent, 'query.resources',
+                        {'course_name': course, 'week_number': rng.choice([week, ''])}, base)
+    if intent == 'Resources.ProvideCourse':
+        return _payload(session, intent, 'provide.course', {'course_name': course},
+                        [_context(session, 'awaiting-course')])
+    if intent == 'Resources.ProvideWeek':
+        return _payload(session, intent, 'provide.week', {'week_number': rng.choice([week, week, ''])},
+                        [_context(session, 'awaiting-week', {'course_name': course})])
+    if intent == 'Resources.More':
+        code = rng.choice(['DB', 'DF', 'DCSP'])
+        return _payload(session, intent, 'resources.more', {},
+                        [_context(session, 'resources-more', {'course_code': code, 'course_name': code,
+                                                              'cursor': f"{week}.1"})])
+    raise ValueError(f"No synthetic generator for intent {intent}")
+
+def load_replay(path):
+    """Read recorded WebhookRequest payloads, skipping lines that aren't one"""
+    payloads = []
+    skipped = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            record = record.get('payload', record) if isinstance(record, dict) else None
+            if isinstance(record, dict) and isinstance(record.get('queryResult'), dict):
+                payloads.append(record)
+            else:
+                skipped += 1
+    return payloads, skipped
+
+def build_workload(args):
+    rng = random.Random(args.seed)
+    if args.replay:
+        recorded, skipped = load_replay(args.replay)
+        if skipped:
+            print(f"Skipped {skipped} lines in {args.replay} that are not Dialogflow webhook requests")
+        if not recorded:
+            sys.exit(f"No replayable payloads found in {args.replay}")
+        return [recorded[i % len(recorded)] for i in range(args.requests)]
+
+    intents = args.intents.split(',') if args.intents else list(INTENT_MIX)
+    weights = [INTENT_MIX.get(intent, 1) for intent in intents]
+    return [synthetic_payload(rng.choices(intents, weights)[0], rng) for _ in range(args.requests)]
+
+def intent_of(payload):
+    return payload.get('queryResult', {}).get('intent', {}).get('displayName') or '(none)'
+
+class InProcessTarget:
+    """Send requests through the Flask test client against a SQLite stand-in"""
+
+    def __init__(self, sqlite_path):
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = sqlite_path
+        # Per-request log lines would only compete with the workload
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        import webhook
+        self.webhook = webhook
+        webhook.create_app(preload=False)
+        webhook.ready.wait(30)
+        self._local = threading.local()
+
+    def post(self, payload):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.webhook.app.test_client(use_cookies=False)
+        response = client.post('/webhook', json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+    def db_queries(self):
+        return self.webhook.db.queries
+
+class HTTPTarget:
+    """Send requests to a running webhook server"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.health_url = url.rsplit('/', 1)[0] + '/health'
+
+    def post(self, payload):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST',
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+        except (urllib.error.URLError, OSError, ValueError):
+            return 0, {}
+
+    def db_queries(self):
+        # Per worker process; exact with a single worker, a sample with several
+        try:
+            with urllib.request.urlopen(self.health_url, timeout=self.timeout) as response:
+                return json.loads(response.read()).get('db_queries')
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+def run(target, workload, concurrency):
+    """Send every payload, `concurrency` at a time; returns (samples, elapsed seconds)"""
+    samples = []
+    lock = threading.Lock()
+    position = iter(range(len(workload)))
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                break
+            payload = workload[index]
+            started = time.perf_counter()
+            status, body = target.post(payload)
+            elapsed = time.perf_counter() - started
+            text = body.get('fulfillmentText', '')
+            ok = status == 200 and bool(text) and not text.startswith(ERROR_PREFIXES)
+            local.append((intent_of(payload), elapsed, ok))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def summarize(samples, elapsed, queries):
+    by_intent = defaultdict(list)
+    errors = defaultdict(int)
+    for intent, latency, ok in samples:
+        by_intent[intent].append(latency)
+        by_intent['ALL'].append(latency)
+        if not ok:
+            errors[intent] += 1
+            errors['ALL'] += 1
+
+    report = {
+        'requests': len(samples),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'db_queries_per_request': round(queries / len(samples), 3) if queries is not None and samples else None,
+        'intents': {},
+    }
+    for intent, latencies in sorted(by_intent.items()):
+        ordered = sorted(latencies)
+        report['intents'][intent] = {
+            'count': len(ordered),
+            'errors': errors[intent],
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        }
+    return report
+
+def print_report(report):
+    print(f"{'intent':<32}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for intent, row in report['intents'].items():
+        print(f"{intent:<32}{row['count']:>8}{row['errors']:>8}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+    print(f"\nrequests: {report['requests']}  elapsed: {report['elapsed_s']}s  "
+          f"throughput: {report['throughput_rps']} req/s")
+    if report['db_queries_per_request'] is not None:
+        print(f"db queries/request: {report['db_queries_per_request']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Benchmark a running server at this webhook URL instead of in-process")
+    parser.add_argument('--replay', help="JSONL file of recorded Dialogflow webhook requests")
+    parser.add_argument('--intents', help="Comma-separated intents for synthetic traffic (default: realistic mix)")
+    parser.add_argument('--requests', type=int, default=2000, help="Measured requests (default: 2000)")
+    parser.add_argument('--warmup', type=int, default=100, help="Unmeasured warm-up requests (default: 100)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients (default: 8)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="HTTP timeout in seconds (default: 10)")
+    parser.add_argument('--sqlite', help="SQLite stand-in path (default: a temporary file)")
+    parser.add_argument('--seed-only', action='store_true', help="Only create the SQLite stand-in and exit")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for synthetic traffic")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        target = HTTPTarget(args.url, args.timeout)
+    else:
+        sqlite_path = args.sqlite or os.path.join(tempfile.mkdtemp(prefix='uni-bot-bench-'), 'bench.sqlite3')
+        seed_sqlite(sqlite_path)
+        if args.seed_only:
+            print(f"Seeded {sqlite_path}")
+            return
+        target = InProcessTarget(sqlite_path)
+
+    workload = build_workload(args)
+
+    run(target, workload[:args.warmup], args.concurrency)
+    queries_before = target.db_queries()
+    samples, elapsed = run(target, workload, args.concurrency)
+    queries_after = target.db_queries()
+
+    queries = queries_after - queries_before if None not in (queries_before, queries_after) else None
+    report = summarize(samples, elapsed, queries)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
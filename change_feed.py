@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from mysql.connector import Error
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+class ChangeFeed:
+    """
+    Follows the `data_changes` table written by importer.py
+
+    Every `interval` seconds the rows added since the last poll are read and
+    the changed items are passed to each subscriber as a dict of
+    kind -> set of items, e.g. {'course': {'DB'}, 'program': {'Computer Science'}}.
+    The first poll only records the current version, so history is not replayed.
+    """
+
+    def __init__(self, db, interval=10):
+        self.db = db
+        self.interval = interval
+        self.version = None
+        self.applied = 0
+        self.last_poll = None
+        self._subscribers = []
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def poll(self):
+        """
+        Read new changes and notify subscribers
+
+        Returns:
+            int: Number of change rows applied
+        """
+        with self._poll_lock:
+            try:
+                if self.version is None:
+                    self.version = self.db.latest_change()
+                    return 0
+                rows = self.db.get_changes_since(self.version)
+            except Error as e:
+                logger.error("Error polling data changes: %s", e)
+                metrics.increment('change_feed_errors_total')
+                return 0
+            self.last_poll = time.time()
+            if not rows:
+                return 0
+
+            changes = defaultdict(set)
+            for row in rows:
+                changes[row['kind']].add(row['item'])
+            for callback in self._subscribers:
+                try:
+                    callback(dict(changes))
+                except Exception:
+                    logger.exception("Error applying data changes")
+                    metrics.increment('change_feed_errors_total')
+            self.version = rows[-1]['version']
+            self.applied += len(rows)
+            metrics.increment('change_feed_changes_total', len(rows))
+            logger.info("Applied data changes", extra={'fields': {
+                'version': self.version,
+                'changes': {kind: sorted(items) for kind, items in changes.items()}
+            }})
+            return len(rows)
+
+    def start(self):
+        """Poll in the background every `interval` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reset_after_fork(self):
+        """Drop the parent's polling thread; the version reached so far is kept"""
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        self.poll()
+        while self.interval > 0 and not self._stop.wait(self.interval):
+            self.poll()
+
+    def stats(self):
+        return {
+            'version': self.version or 0,
+            'applied': self.applied,
+            'last_poll': self.last_poll,
+        }
@@ -0,0 +1,188 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no course information in requests like "notes for databases week 3"
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'the', 'of', 'for', 'to', 'in', 'on', 'me', 'my', 'i',
+    'course', 'module', 'class', 'lecture', 'lectures', 'notes', 'materials',
+    'resources', 'week', 'weeks', 'all', 'show', 'get', 'need',
+})
+
+FUZZY_THRESHOLD = 0.5
+
+def normalize(text):
+    """Lowercase, turn '&' into 'and' and collapse everything else to single spaces"""
+    text = str(text).lower().replace('&', ' and ')
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+def trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CourseResolver:
+    """
+    Resolve free-text course names (@sys.any) to canonical courses
+
+    Matching runs entirely in memory: exact alias lookups on the whole input,
+    then on its word n-grams (longest first), then words that start with an
+    input token ('data' -> 'databases'), then a trigram similarity search
+    over course name and alias tokens to tolerate typos.
+    """
+
+    def __init__(self, db, refresh_interval=900, retry_interval=30):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.loaded_at = None
+        self._failed_at = None
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def reset_after_fork(self):
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Rebuild the alias and trigram indexes from the courses tables
+
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        with self._refresh_lock:
+            try:
+                courses = self.db.get_all_courses()
+                alias_rows = self.db.get_course_aliases()
+            except Error as e:
+                logger.error("Error loading courses: %s", e)
+                courses = None
+            if not courses:
+                # Keep serving the previous snapshot if the database is unavailable
+                self._failed_at = time.monotonic()
+                return False
+
+            by_code = {
+                course['course_code']: {'course_code': course['course_code'], 'course_name': course['course_name']}
+                for course in courses
+            }
+            aliases = {}
+            for course in by_code.values():
+                aliases[normalize(course['course_code'])] = course['course_code']
+                aliases[normalize(course['course_name'])] = course['course_code']
+            for row in alias_rows:
+                if row['course_code'] in by_code:
+                    aliases[normalize(row['alias'])] = row['course_code']
+
+            vocabulary = defaultdict(set)
+            for alias, code in aliases.items():
+                for token in alias.split():
+                    if token not in STOPWORDS and len(token) >= 3:
+                        vocabulary[token].add(code)
+            trigram_index = defaultdict(set)
+            for token in vocabulary:
+                for gram in trigrams(token):
+                    trigram_index[gram].add(token)
+
+            self._snapshot = (by_code, aliases, dict(vocabulary), dict(trigram_index), sorted(vocabulary))
+            self.loaded_at = time.monotonic()
+            self._failed_at = None
+            return True
+
+    def _current(self):
+        if self._snapshot is None:
+            # Load on the request path, but not again within retry_interval of a failure,
+            # so an unreachable database doesn't hold up every request
+            if ((self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_interval)
+                    and not self._refresh_lock.locked()):
+                self.refresh()
+        elif (self.refresh_interval and time.monotonic() - self.loaded_at > self.refresh_interval
+              and not self._refresh_lock.locked()):
+            # Reload in the background; requests keep using the current snapshot
+            threading.Thread(target=self.refresh, name='course-refresh', daemon=True).start()
+        return self._snapshot
+
+    def courses(self):
+        """All known courses ordered by name"""
+        snapshot = self._current()
+        if snapshot is None:
+            return []
+        return sorted(snapshot[0].values(), key=lambda course: course['course_name'])
+
+    def resolve(self, text):
+        """
+        Find the course(s) a student meant
+
+        Args:
+            text (str): Free-text course name, e.g. 'db', 'Digital forensics notes', 'databse'
+
+        Returns:
+            list: Matching course dicts (course_code, course_name), best first.
+                  Exactly one entry means the input was unambiguous.
+        """
+        snapshot = self._current()
+        if snapshot is None or not text:
+            return []
+        by_code, aliases, vocabulary, trigram_index, words = snapshot
+
+        query = normalize(text)
+        if query in aliases:
+            return [by_code[aliases[query]]]
+
+        # Exact alias hits on word n-grams, longest first ("digital forensics week 2")
+        tokens = query.split()
+        for size in range(min(len(tokens), 4), 0, -1):
+            codes = {
+                aliases[' '.join(tokens[i:i + size])]
+                for i in range(len(tokens) - size + 1)
+                if ' '.join(tokens[i:i + size]) in aliases
+            }
+            if codes:
+                return [by_code[code] for code in sorted(codes)]
+
+        # Abbreviated words: course words starting with an input token ('data', 'foren')
+        codes = set()
+        for token in tokens:
+            if token in STOPWORDS or len(token) < 3:
+                continue
+            start = bisect.bisect_left(words, token)
+            for word in words[start:]:
+                if not word.startswith(token):
+                    break
+                codes |= vocabulary[word]
+        if codes:
+            return [by_code[code] for code in sorted(codes)]
+
+        # Typo-tolerant match: trigram similarity between input and course tokens
+        scores = defaultdict(float)
+        for token in tokens:
+            if token in STOPWORDS or len(token) < 3:
+                continue
+            grams = trigrams(token)
+            candidates = set()
+            for gram in grams:
+                candidates |= trigram_index.get(gram, set())
+            best = {}
+            for candidate in candidates:
+                other = trigrams(candidate)
+                similarity = len(grams & other) / len(grams | other)
+                if similarity >= FUZZY_THRESHOLD:
+                    for code in vocabulary[candidate]:
+                        best[code] = max(best.get(code, 0.0), similarity)
+            for code, similarity in best.items():
+                scores[code] += similarity
+
+        if not scores:
+            return []
+        top = max(scores.values())
+        ranked = sorted(scores, key=lambda code: -scores[code])
+        return [by_code[code] for code in ranked if scores[code] >= top * 0.8]
@@ -1,41 +1,484 @@
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errors
+import logging
 import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from datetime import datetime
+from singleflight import SingleFlight, coalesced
+from instrumentation import metrics, timed_query
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# 'today' and 'tomorrow' are resolved in the university's timezone, not the server's
+TIMEZONE = ZoneInfo(os.getenv('BOT_TIMEZONE')) if os.getenv('BOT_TIMEZONE') else None
+
+def local_now():
+    """Current time in BOT_TIMEZONE (or the server's local time if unset)"""
+    return datetime.now(TIMEZONE)
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+DAY_ABBREVIATIONS = {
+    'mon': 'monday', 'tue': 'tuesday', 'tues': 'tuesday', 'wed': 'wednesday',
+    'thu': 'thursday', 'thur': 'thursday', 'thurs': 'thursday', 'fri': 'friday',
+    'sat': 'saturday', 'sun': 'sunday',
+}
+WEEK_QUERIES = ('week', 'this week', 'next week', 'the week', 'whole week', 'all week', 'my week')
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections
+
+    Connections are opened lazily up to `size`. Borrowers wait up to `timeout`
+    seconds for a free connection. A borrowed connection that has been idle
+    longer than `ping_interval` seconds is pinged first and transparently
+    replaced if the server has dropped it.
+    """
+
+    def __init__(self, connect_args, size=5, timeout=3.0, ping_interval=30.0, query_timeout_ms=0):
+        self.connect_args = connect_args
+        self.query_timeout_ms = query_timeout_ms
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Monitoring counters
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+
+    def _open(self):
+        connection = mysql.connector.connect(**self.connect_args)
+        if self.query_timeout_ms:
+            # Let the server abort SELECTs whose caller has already given up
+            try:
+                cursor = connection.cursor()
+                cursor.execute("SET SESSION max_execution_time = %s", (self.query_timeout_ms,))
+                cursor.close()
+            except Error as e:
+                logger.warning("Could not set max_execution_time: %s", e)
+        return connection
+
+    def prefill(self, count):
+        """Open idle connections up front so the first requests don't pay for connecting"""
+        opened = []
+        with self._cond:
+            count = min(count, self.size - self._created)
+            self._created += max(count, 0)
+        try:
+            for _ in range(max(count, 0)):
+                opened.append(self._open())
+        finally:
+            with self._cond:
+                self._created -= count - len(opened)
+                now = time.monotonic()
+                self._idle.extend((connection, now) for connection in opened)
+                self._cond.notify_all()
+        return len(opened)
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        Borrow a healthy connection from the pool
+
+        Raises:
+            PoolError: if no connection frees up within `timeout` seconds
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise errors.PoolError("Connection pool is closed")
+                if self._idle:
+                    # LIFO keeps the most recently used connections warm
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    connection, last_used = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise errors.PoolError(
+                        f"No database connection available after {self.timeout}s"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            connection = self._ensure_healthy(connection, last_used)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_total += elapsed
+            self._checkout_max = max(self._checkout_max, elapsed)
+        return connection
+
+    def _ensure_healthy(self, connection, last_used):
+        """Open a new connection, or ping an idle one and replace it if dead"""
+        if connection is None:
+            return self._open()
+        if time.monotonic() - last_used < self.ping_interval:
+            return connection
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Error:
+            self._close_quietly(connection)
+            with self._cond:
+                self._replaced += 1
+            return self._open()
+
+    def release(self, connection, broken=False):
+        """Return a borrowed connection; broken connections are discarded"""
+        with self._cond:
+            self._in_use -= 1
+            if broken or self._closed:
+                self._created -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            self._cond.notify()
+        if connection is not None:
+            self._close_quietly(connection)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'replaced': self._replaced,
+                'avg_checkout_ms': round(self._checkout_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'max_checkout_ms': round(self._checkout_max * 1000, 3),
+            }
+
 class Database:
     def __init__(self):
         self.host = os.getenv('DB_HOST', 'localhost')
         self.user = os.getenv('DB_USER')
         self.password = os.getenv('DB_PASSWORD')
         self.database = os.getenv('DB_NAME')
-        self.connection = None
+        self.pool_size = int(os.getenv('DB_POOL_SIZE', 5))
+        self.pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', 3))
+        self.pool_ping_interval = float(os.getenv('DB_POOL_PING_INTERVAL', 30))
+        self.query_timeout_ms = int(os.getenv('DB_QUERY_TIMEOUT_MS', 4000))
+        self.prepared_statements = os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() in ('1', 'true', 'yes')
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        # Identical concurrent queries share one round-trip
+        self.flight = SingleFlight()
+        self.queries = 0
+        self._queries_lock = threading.Lock()
+        # How often data_version() re-reads `data_changes` (0: never, e.g. when ChangeFeed runs)
+        self.data_version_interval = float(os.getenv('DATA_VERSION_POLL_SECONDS', 5))
+        self._data_version = 0
+        self._data_version_checked = None
+        self._data_version_lock = threading.Lock()
+    
+    def _get_pool(self):
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = ConnectionPool(
+                        {
+                            'host': self.host,
+                            'user': self.user,
+                            'password': self.password,
+                            'database': self.database,
+                            # Read-only workload: don't pin a stale snapshot
+                            # for the lifetime of a pooled connection
+                            'autocommit': True,
+                            # C extension when installed, pure Python otherwise
+                            # (use_pure=False without it raises ImportError)
+                            'use_pure': not mysql.connector.HAVE_CEXT,
+                        },
+                        size=self.pool_size,
+                        timeout=self.pool_timeout,
+                        ping_interval=self.pool_ping_interval,
+                        query_timeout_ms=self.query_timeout_ms,
+                    )
+        return self.pool
     
     def connect(self):
-        """Create database connection"""
-        try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
-            if self.connection.is_connected():
-                print("Successfully connected to MySQL database")
-                return True
+        """Create the connection pool and verify the database is reachable"""
+        try:
+            with self.cursor():
+                pass
+            logger.info("Successfully connected to MySQL database (%s)",
+                        'C extension' if mysql.connector.HAVE_CEXT else 'pure Python driver')
+            return True
         except Error as e:
-            print(f"Error connecting to MySQL: {e}")
+            logger.error("Error connecting to MySQL: %s", e)
             return False
     
+    def warm_up(self, connections=1):
+        """Open `connections` pooled connections ahead of the first request"""
+        try:
+            return self._get_pool().prefill(connections)
+        except Error as e:
+            logger.error("Error warming up connection pool: %s", e)
+            return 0
+    
+    def reset_after_fork(self):
+        """
+        Forget connections inherited from the parent process
+        
+        They are dropped without closing: closing would send COM_QUIT over a
+        socket the parent still owns.
+        """
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self.flight = SingleFlight()
+        self._queries_lock = threading.Lock()
+        self._data_version_lock = threading.Lock()
+    
     def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("MySQL connection closed")
+        """Close all pooled database connections"""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+            logger.info("MySQL connection closed")
+    
+    def _count_query(self):
+        with self._queries_lock:
+            self.queries += 1
+    
+    @contextmanager
+    def cursor(self):
+        """Borrow a pooled connection and yield a dictionary cursor on it"""
+        self._count_query()
+        pool = self._get_pool()
+        connection = pool.acquire()
+        broken = False
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            yield cursor
+        except (errors.OperationalError, errors.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    broken = True
+            pool.release(connection, broken)
+    
+    @contextmanager
+    def prepared(self, query):
+        """
+        Borrow a pooled connection and yield a prepared dictionary cursor for `query`
+        
+        Each connection prepares a statement on the server once and keeps the
+        cursor, so later calls only send parameters over the binary protocol.
+        Falls back to cursor() when DB_PREPARED_STATEMENTS is off.
+        """
+        if not self.prepared_statements:
+            with self.cursor() as cursor:
+                yield cursor
+            return
+        
+        self._count_query()
+        pool = self._get_pool()
+        connection = pool.acquire()
+        broken = False
+        cursors = getattr(connection, 'prepared_cursors', None)
+        if cursors is None:
+            cursors = connection.prepared_cursors = {}
+        try:
+            cursor = cursors.get(query)
+            if cursor is None:
+                cursor = cursors[query] = connection.cursor(prepared=True, dictionary=True)
+            yield cursor
+        except Error as e:
+            broken = isinstance(e, (errors.OperationalError, errors.InterfaceError))
+            # Prepare again next time rather than reuse a cursor in an unknown state
+            cursor = cursors.pop(query, None)
+            if cursor is not None and not broken:
+                try:
+                    cursor.close()
+                except Error:
+                    broken = True
+            raise
+        finally:
+            pool.release(connection, broken)
     
+    @contextmanager
+    def transaction(self):
+        """Borrow a pooled connection and yield a dictionary cursor inside one transaction"""
+        self._count_query()
+        pool = self._get_pool()
+        connection = pool.acquire()
+        broken = False
+        cursor = None
+        try:
+            connection.start_transaction()
+            cursor = connection.cursor(dictionary=True)
+            yield cursor
+            connection.commit()
+        except BaseException as e:
+            broken = isinstance(e, (errors.OperationalError, errors.InterfaceError))
+            try:
+                connection.rollback()
+            except Error:
+                broken = True
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    broken = True
+            pool.release(connection, broken)
+    
+    def upsert_statement(self, table, columns, keys):
+        """
+        INSERT statement that updates the existing row on a unique key conflict
+        
+        Args:
+            table (str): Table name
+            columns (tuple): Columns in parameter order
+            keys (tuple): Columns of the unique key the rows are matched on
+        
+        Returns:
+            str: Statement for cursor.executemany
+        """
+        updates = [column for column in columns if column not in keys] or list(keys[:1])
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE {', '.join(f'{column} = VALUES({column})' for column in updates)}"
+        )
+    
+    def record_changes(self, items):
+        """
+        Record changed courses/programs in `data_changes` after an import
+        
+        Args:
+            items (iterable): (kind, item) pairs, e.g. ('course', 'DB')
+        
+        Returns:
+            int: The new data version (highest change id), or None if nothing changed
+        """
+        items = sorted(set(items))
+        if not items:
+            return None
+        with self.transaction() as cursor:
+            cursor.executemany("INSERT INTO data_changes (kind, item) VALUES (%s, %s)", items)
+            cursor.execute("SELECT MAX(version) AS version FROM data_changes")
+            return cursor.fetchone()['version']
+    
+    def latest_change(self):
+        """Highest version in `data_changes` (0 if there are none)"""
+        with self.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) AS version FROM data_changes")
+            row = cursor.fetchone()
+        return (row and row['version']) or 0
+    
+    def get_changes_since(self, version):
+        """
+        Get changes recorded after `version`
+        
+        Returns:
+            list: Dictionaries with version, kind and item, oldest first
+        
+        Raises:
+            Error: if the query fails, so callers can retry from the same version
+        """
+        query = "SELECT version, kind, item FROM data_changes WHERE version > %s ORDER BY version"
+        with self.prepared(query) as cursor:
+            cursor.execute(query, (version,))
+            return cursor.fetchall()
+    
+    def pool_stats(self):
+        """Connection pool statistics (empty until the pool is created)"""
+        return self.pool.stats() if self.pool else {}
+    
+    def data_version(self):
+        """
+        Version of the underlying data; cached answers built from another version are rebuilt
+        
+        This is the latest `data_changes` version, re-read at most every
+        `data_version_interval` seconds. The read runs in a background thread,
+        so a slow database never holds up the request that notices it is due;
+        callers get the last value meanwhile, and keep it if the read fails.
+        """
+        if not self.data_version_interval:
+            return self._data_version
+        checked = self._data_version_checked
+        now = time.monotonic()
+        if ((checked is None or now - checked >= self.data_version_interval)
+                and self._data_version_lock.acquire(blocking=False)):
+            self._data_version_checked = now
+            try:
+                threading.Thread(target=self._read_data_version, name='data-version', daemon=True).start()
+            except BaseException:
+                self._data_version_lock.release()
+                raise
+        return self._data_version
+    
+    def _read_data_version(self):
+        try:
+            self._data_version = self.latest_change()
+        except Error as e:
+            logger.warning("Could not read the data version: %s", e)
+        finally:
+            self._data_version_lock.release()
+    
+    @coalesced
+    @timed_query
     def get_lectures_by_day(self, program, year_level, weekday):
         """
         Get lectures for specific program, year, and day
@@ -47,38 +490,93 @@ class Database:
         
         Returns:
             list: List of lecture dictionaries
+        
+        Raises:
+            Error: if the query fails, so a failure isn't mistaken for a free day
+        """
+        query = """
+            SELECT 
+                course_code,
+                title,
+                start_time,
+                end_time,
+                venue,
+                topic
+            FROM lectures
+            WHERE program = %s 
+            AND year_level = %s 
+            AND weekday = %s
+            ORDER BY start_time
         """
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
         
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            
-            query = """
-                SELECT 
-                    course_code,
-                    title,
-                    start_time,
-                    end_time,
-                    venue,
-                    topic,
-                    weekday
-                FROM lectures
-                WHERE program = %s 
-                AND year_level = %s 
-                AND weekday = %s
-                ORDER BY start_time
-            """
-            
-            cursor.execute(query, (program, year_level, weekday.lower()))
-            lectures = cursor.fetchall()
-            cursor.close()
-            
-            return lectures
+            with self.prepared(query) as cursor:
+                cursor.execute(query, (program, year_level, weekday.lower()))
+                return cursor.fetchall()
             
         except Error as e:
-            print(f"Error fetching lectures: {e}")
-            return []
+            logger.error("Error fetching lectures: %s", e)
+            metrics.increment('db_errors_total', method='get_lectures_by_day')
+            raise
+    
+    @timed_query
+    def get_all_lectures(self):
+        """
+        Get the whole timetable, used to build the in-memory timetable index
+        
+        Returns:
+            list: List of lecture dictionaries including program, year_level and weekday
+        
+        Raises:
+            Error: if the query fails, so callers can keep their previous snapshot
+        """
+        query = """
+            SELECT 
+                program,
+                year_level,
+                weekday,
+                course_code,
+                title,
+                start_time,
+                end_time,
+                venue,
+                topic
+            FROM lectures
+            ORDER BY program, year_level, weekday, start_time
+        """
+        
+        with self.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.fetchall()
+    
+    @timed_query
+    def get_lectures_for_programs(self, programs):
+        """
+        Get the whole timetable of some programs, used to patch the timetable index
+        
+        Raises:
+            Error: if the query fails, so callers can keep their previous snapshot
+        """
+        placeholders = ', '.join(['%s'] * len(programs))
+        query = f"""
+            SELECT 
+                program,
+                year_level,
+                weekday,
+                course_code,
+                title,
+                start_time,
+                end_time,
+                venue,
+                topic
+            FROM lectures
+            WHERE program IN ({placeholders})
+            ORDER BY program, year_level, weekday, start_time
+        """
+        
+        with self.cursor() as cursor:
+            cursor.execute(query, tuple(programs))
+            return cursor.fetchall()
     
     def get_day_name(self, day_query):
         """
@@ -90,85 +588,306 @@ class Database:
         Returns:
             str: Weekday name in lowercase
         """
-        from datetime import datetime, timedelta
-        
         if day_query == 'today':
-            return datetime.now().strftime('%A').lower()
+            return local_now().strftime('%A').lower()
         elif day_query == 'tomorrow':
-            tomorrow = datetime.now() + timedelta(days=1)
+            tomorrow = local_now() + timedelta(days=1)
             return tomorrow.strftime('%A').lower()
         else:
             # Already a day name (monday, tuesday, etc.)
-            return day_query.lower()
+            day = day_query.lower()
+            return DAY_ABBREVIATIONS.get(day, day)
+
+    def get_day_names(self, day_query):
+        """
+        Convert a day or day-range query to weekday names
+        
+        Args:
+            day_query (str): 'today', 'tomorrow', a day name, 'this week',
+                'next week', 'weekend', 'rest of the week', a range such as
+                'Monday to Wednesday' / 'mon-wed', or a list such as
+                'Monday and Friday'
+        
+        Returns:
+            list: Weekday names in lowercase, in the order asked for
+        """
+        query = ' '.join(str(day_query or 'today').lower().replace('-', ' to ').replace(',', ' and ').split())
+        
+        # The timetable repeats weekly, so "next week" lists the same days
+        if query in WEEK_QUERIES:
+            return list(WEEKDAYS[:5])
+        if query in ('weekend', 'this weekend', 'the weekend', 'next weekend'):
+            return list(WEEKDAYS[5:])
+        if query in ('rest of the week', 'rest of week', 'rest of this week'):
+            today = WEEKDAYS.index(self.get_day_name('today'))
+            return list(WEEKDAYS[today:5] if today < 5 else WEEKDAYS[today:])
+        
+        day_range = re.fullmatch(r'(?:from )?(\w+) (?:to|through|thru|until|till) (\w+)', query)
+        if day_range:
+            first, last = (self.get_day_name(day) for day in day_range.groups())
+            if first in WEEKDAYS and last in WEEKDAYS:
+                start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+                # Wraps around the weekend for ranges like 'friday to monday'
+                return [WEEKDAYS[(start + offset) % 7] for offset in range((end - start) % 7 + 1)]
+        
+        if ' and ' in query:
+            days = [self.get_day_name(day) for day in query.split(' and ') if day]
+            if all(day in WEEKDAYS for day in days):
+                return list(dict.fromkeys(days))
+        
+        return [self.get_day_name(query)]
 
-    def get_course_resources(self, course_name, week_number=None):
+    @coalesced
+    @timed_query
+    def get_lectures_for_days(self, program, year_level, weekdays):
         """
-        Get course resources/links by course name and optionally by week
+        Get lectures for several days in one query
         
         Args:
-            course_name: Name of the course
+            program (str): Program name (e.g., 'Computer Science')
+            year_level (int): Year level (1, 2, 3, or 4)
+            weekdays (tuple): Days of week (e.g., ('monday', 'tuesday'))
+        
+        Returns:
+            dict: Weekday -> list of lecture dictionaries sorted by start time
+        
+        Raises:
+            Error: if the query fails
+        """
+        placeholders = ', '.join(['%s'] * len(weekdays))
+        query = f"""
+            SELECT 
+                course_code,
+                title,
+                start_time,
+                end_time,
+                venue,
+                topic,
+                weekday
+            FROM lectures
+            WHERE program = %s 
+            AND year_level = %s 
+            AND weekday IN ({placeholders})
+            ORDER BY weekday, start_time
+        """
+        
+        lectures_by_day = {day: [] for day in weekdays}
+        try:
+            with self.prepared(query) as cursor:
+                cursor.execute(query, (program, year_level, *weekdays))
+                rows = cursor.fetchall()
+        except Error as e:
+            logger.error("Error fetching lectures: %s", e)
+            metrics.increment('db_errors_total', method='get_lectures_for_days')
+            raise
+        
+        for row in rows:
+            lectures_by_day.setdefault(row['weekday'].lower(), []).append(row)
+        return lectures_by_day
+
+    @coalesced
+    @timed_query
+    def get_course_resources(self, course_code, week_number=None):
+        """
+        Get course resources/links by course code and optionally by week
+        
+        Args:
+            course_code: Canonical course code (e.g., 'DB'), see CourseResolver
             week_number: Optional week number (1-12)
         
         Returns:
             List of resource dictionaries
+        
+        Raises:
+            Error: if the query fails
         """
+        # Only the columns format_resources_response uses, all served from idx_resource_listing
+        if week_number:
+            query = """
+                SELECT week_number, resource_order, resource_title, resource_url
+                FROM course_resources 
+                WHERE course_code = %s 
+                AND week_number = %s
+                ORDER BY resource_order
+            """
+            params = (course_code, week_number)
+        else:
+            query = """
+                SELECT week_number, resource_order, resource_title, resource_url
+                FROM course_resources 
+                WHERE course_code = %s
+                ORDER BY week_number, resource_order
+            """
+            params = (course_code,)
+        
         try:
-            cursor = self.connection.cursor(dictionary=True)
+            with self.prepared(query) as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
             
-            if week_number:
-                query = """
-                    SELECT * FROM course_resources 
-                    WHERE LOWER(course_name) LIKE LOWER(%s) 
-                    AND week_number = %s
-                    ORDER BY week_number, resource_order
-                """
-                cursor.execute(query, (f"%{course_name}%", week_number))
-            else:
-                query = """
-                    SELECT * FROM course_resources 
-                    WHERE LOWER(course_name) LIKE LOWER(%s)
-                    ORDER BY week_number, resource_order
-                """
-                cursor.execute(query, (f"%{course_name}%",))
-            
-            results = cursor.fetchall()
-            cursor.close()
-            return results
-            
-        except Exception as e:
-            print(f"Error fetching course resources: {e}")
-            return []
+        except Error as e:
+            logger.error("Error fetching course resources: %s", e)
+            metrics.increment('db_errors_total', method='get_course_resources')
+            raise
     
+    @coalesced
+    @timed_query
+    def get_course_resources_page(self, course_code, after=None, limit=10):
+        """
+        Get one page of a course's resources in (week_number, resource_order) order
+        
+        Pages are keyset-based: each starts right after the last resource of
+        the previous page, so every page costs one bounded index range read.
+        The position is spelled out with OR rather than a row constructor
+        `(week_number, resource_order) > (...)`, which MySQL only matches on
+        the leading `course_code` equality, re-reading the course from its
+        first row on every page.
+        
+        Args:
+            course_code: Canonical course code (e.g., 'DB')
+            after (tuple): (week_number, resource_order) of the last resource
+                already shown, or None for the first page
+            limit (int): Maximum number of resources to return
+        
+        Returns:
+            List of resource dictionaries
+        
+        Raises:
+            Error: if the query fails
+        """
+        if after is None:
+            query = """
+                SELECT week_number, resource_order, resource_title, resource_url
+                FROM course_resources 
+                WHERE course_code = %s
+                ORDER BY week_number, resource_order
+                LIMIT %s
+            """
+            params = (course_code, limit)
+        else:
+            query = """
+                SELECT week_number, resource_order, resource_title, resource_url
+                FROM course_resources 
+                WHERE course_code = %s
+                AND (week_number > %s OR (week_number = %s AND resource_order > %s))
+                ORDER BY week_number, resource_order
+                LIMIT %s
+            """
+            params = (course_code, after[0], after[0], after[1], limit)
+        
+        try:
+            with self.prepared(query) as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+        except Error as e:
+            logger.error("Error fetching course resources: %s", e)
+            metrics.increment('db_errors_total', method='get_course_resources_page')
+            raise
+    
+    @timed_query
+    def get_program_years(self):
+        """
+        Get every (program, year_level) that has lectures
+        
+        Returns:
+            list: Dictionaries with program and year_level
+        
+        Raises:
+            Error: if the query fails, so a precompute run fails instead of storing nothing
+        """
+        try:
+            with self.cursor() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT program, year_level
+                    FROM lectures
+                    ORDER BY program, year_level
+                """)
+                return cursor.fetchall()
+        except Error as e:
+            logger.error("Error fetching programs: %s", e)
+            metrics.increment('db_errors_total', method='get_program_years')
+            raise
+    
+    @timed_query
+    def get_timetable_days(self):
+        """
+        Get every (program, year_level, weekday) that has lectures, used to validate schedule requests
+
+        Raises:
+            Error: if the query fails, so callers can keep their previous snapshot
+        """
+        with self.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT program, year_level, weekday FROM lectures")
+            return cursor.fetchall()
+
+    @timed_query
+    def get_resource_weeks(self):
+        """
+        Get every (course_code, week_number) that has resources, used to validate resource requests
+
+        Raises:
+            Error: if the query fails, so callers can keep their previous snapshot
+        """
+        with self.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT course_code, week_number FROM course_resources")
+            return cursor.fetchall()
+
+    @coalesced
+    @timed_query
     def get_all_courses(self):
-        """Get list of all available courses"""
+        """Get list of all available courses (raises Error if the query fails)"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            query = "SELECT DISTINCT course_name, course_code FROM course_resources ORDER BY course_name"
-            cursor.execute(query)
-            results = cursor.fetchall()
-            cursor.close()
-            return results
-        except Exception as e:
-            print(f"Error fetching courses: {e}")
-            return []
+            with self.cursor() as cursor:
+                query = "SELECT course_name, course_code FROM courses ORDER BY course_name"
+                cursor.execute(query)
+                return cursor.fetchall()
+        except Error as e:
+            logger.error("Error fetching courses: %s", e)
+            metrics.increment('db_errors_total', method='get_all_courses')
+            raise
     
-    def get_weeks_for_course(self, course_name):
-        """Get available weeks for a specific course"""
+    @timed_query
+    def get_course_aliases(self):
+        """Get all course synonyms (alias, course_code); raises Error if the query fails"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            query = """
-                SELECT DISTINCT week_number 
-                FROM course_resources 
-                WHERE LOWER(course_name) LIKE LOWER(%s)
-                ORDER BY week_number
-            """
-            cursor.execute(query, (f"%{course_name}%",))
-            results = cursor.fetchall()
-            cursor.close()
+            with self.cursor() as cursor:
+                cursor.execute("SELECT alias, course_code FROM course_aliases")
+                return cursor.fetchall()
+        except Error as e:
+            logger.error("Error fetching course aliases: %s", e)
+            metrics.increment('db_errors_total', method='get_course_aliases')
+            raise
+    
+    @coalesced
+    @timed_query
+    def get_weeks_for_course(self, course_code):
+        """Get available weeks for a specific course code (raises Error if the query fails)"""
+        query = """
+            SELECT DISTINCT week_number 
+            FROM course_resources 
+            WHERE course_code = %s
+            ORDER BY week_number
+        """
+        try:
+            with self.prepared(query) as cursor:
+                cursor.execute(query, (course_code,))
+                results = cursor.fetchall()
             return [row['week_number'] for row in results]
-        except Exception as e:
-            print(f"Error fetching weeks: {e}")
-            return []
+        except Error as e:
+            logger.error("Error fetching weeks: %s", e)
+            metrics.increment('db_errors_total', method='get_weeks_for_course')
+            raise
+
+def create_database():
+    """Create the configured storage backend (DB_BACKEND=mysql|sqlite|snapshot)"""
+    backend = os.getenv('DB_BACKEND', 'mysql').lower()
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase()
+    if backend == 'snapshot':
+        from snapshot import SnapshotDatabase
+        return SnapshotDatabase()
+    return Database()
 
 # Test function
 if __name__ == "__main__":
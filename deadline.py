@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work does not finish within the request's time budget"""
+
+class DeadlineExecutor:
+    """
+    Run database-backed work off the request thread within a time budget
+
+    The request thread waits at most `timeout` seconds for the result. Work
+    that has not started by then is cancelled; work already running is left
+    to finish (MySQL aborts it server-side via max_execution_time) and its
+    result is discarded.
+    """
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='webhook-db')
+        return self._executor
+
+    def run(self, fn, timeout):
+        """
+        Call `fn()` on a worker thread and wait up to `timeout` seconds
+
+        Raises:
+            DeadlineExceeded: if the budget runs out first
+        """
+        if timeout <= 0:
+            raise DeadlineExceeded("No time budget left")
+        future = self._get_executor().submit(fn)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceeded(f"Gave up after {timeout:.3f}s")
+
+    def reset_after_fork(self):
+        """Worker threads don't survive fork; start a new pool on next use"""
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
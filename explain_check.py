@@ -0,0 +1,204 @@
+"""
+Query-plan regression check for the Database queries
+
+Runs every query method of `Database` against a MySQL server (DB_* settings)
+with EXPLAIN in front of its SQL, and fails if a per-request query scans a
+whole table or index or needs a filesort or temporary table. Bulk loads
+read every row by design and are only checked for sorting. Keyset queries
+must also seek into their index on every column of the position they
+continue from, which a plain EXPLAIN doesn't show (an equality prefix
+alone is still `ref`), so their JSON plans are checked for `range` access
+and the key parts used.
+
+    mysql -u root uni_bot < init_database.sql
+    python explain_check.py
+
+Exits with status 1 on any regression, so it can run in CI next to a MySQL
+service container. Plans on near-empty tables can differ from production,
+so load representative data (e.g. with importer.py) first.
+"""
+import json
+import logging
+import sys
+from contextlib import contextmanager
+from mysql.connector import Error
+from database import Database
+
+# (method, arguments, bulk load)
+CHECKS = (
+    ('get_lectures_by_day', ('Computer Science', 2, 'monday'), False),
+    ('get_lectures_for_days', ('Computer Science', 2, ('monday', 'wednesday', 'friday')), False),
+    ('get_lectures_for_programs', (('Computer Science', 'Software Engineering'),), False),
+    ('get_course_resources', ('DB', 2), False),
+    ('get_course_resources', ('DB',), False),
+    ('get_course_resources_page', ('DB', None, 11), False),
+    ('get_course_resources_page', ('DB', (3, 2), 11), False),
+    ('get_weeks_for_course', ('DB',), False),
+    ('get_changes_since', (0,), False),
+    ('latest_change', (), False),
+    ('get_all_lectures', (), True),
+    ('get_program_years', (), True),
+    ('get_timetable_days', (), True),
+    ('get_resource_weeks', (), True),
+    ('get_all_courses', (), True),
+    ('get_course_aliases', (), True),
+)
+
+# Keyset queries: (method, arguments, key parts the range read must use)
+SEEKS = (
+    ('get_course_resources_page', ('DB', (3, 2), 11), ('course_code', 'week_number')),
+)
+
+# EXPLAIN access types that read a whole table or index
+FULL_SCANS = ('ALL', 'index')
+
+class ExplainCursor:
+    """Runs EXPLAIN <query> instead of the query and records the plan rows"""
+
+    def __init__(self, cursor, plans, prefix):
+        self._cursor = cursor
+        self._plans = plans
+        self._prefix = prefix
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self._prefix + query, params)
+        self._plans.append((' '.join(query.split()), self._cursor.fetchall()))
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+class ExplainDatabase(Database):
+    """Database whose queries are explained rather than run"""
+
+    def __init__(self):
+        super().__init__()
+        self.prepared_statements = False
+        self.plans = []
+        self.prefix = "EXPLAIN "
+
+    @contextmanager
+    def cursor(self):
+        with super().cursor() as cursor:
+            yield ExplainCursor(cursor, self.plans, self.prefix)
+
+def problems(plan_rows, bulk):
+    """Describe what is wrong with one EXPLAIN result (empty list if nothing)"""
+    found = []
+    for row in plan_rows:
+        extra = row.get('Extra') or ''
+        if 'Using filesort' in extra:
+            found.append(f"filesort on {row.get('table')}")
+        if 'Using temporary' in extra:
+            found.append(f"temporary table on {row.get('table')}")
+        if not bulk and row.get('type') in FULL_SCANS:
+            found.append(f"full {'table' if row['type'] == 'ALL' else 'index'} scan of {row.get('table')}")
+    return found
+
+def table_accesses(plan):
+    """Every table access in an EXPLAIN FORMAT=JSON plan"""
+    if isinstance(plan, dict):
+        if 'table_name' in plan:
+            yield plan
+        for value in plan.values():
+            yield from table_accesses(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from table_accesses(value)
+
+def seek_problems(plan_rows, key_parts):
+    """
+    Check a JSON plan reads a range on at least `key_parts`
+
+    Returns:
+        tuple: (plan rows in the EXPLAIN column layout, problems)
+    """
+    rows, found = [], []
+    for row in plan_rows:
+        for access in table_accesses(json.loads(next(iter(row.values())))):
+            used = access.get('used_key_parts') or []
+            rows.append({
+                'table': access['table_name'],
+                'type': access.get('access_type'),
+                'key': access.get('key'),
+                'Extra': f"used_key_parts={','.join(used)} key_length={access.get('key_length')}",
+            })
+            if access.get('access_type') != 'range':
+                found.append(f"{access.get('access_type')} access on {access['table_name']} instead of a range seek")
+            missing = [part for part in key_parts if part not in used]
+            if missing:
+                found.append(f"seek on {access['table_name']} doesn't use {', '.join(missing)}")
+    return rows, found
+
+def _explain(db, method, args):
+    """Run the undecorated method, returning an error message if it fails"""
+    # Coalescing would hide repeated statements
+    function = getattr(Database, method)
+    while hasattr(function, '__wrapped__'):
+        function = function.__wrapped__
+    db.plans.clear()
+    try:
+        function(db, *args)
+    except Error as e:
+        return f"query failed: {e}"
+    return None
+
+def run_checks(db):
+    """
+    Explain every query in CHECKS and SEEKS
+
+    Returns:
+        list: (method, query, plan rows, problems) per executed statement
+    """
+    results = []
+    for method, args, bulk in CHECKS:
+        error = _explain(db, method, args)
+        if error:
+            results.append((method, None, [], [error]))
+            continue
+        if not db.plans:
+            results.append((method, None, [], ["no query was executed"]))
+        for query, rows in db.plans:
+            results.append((method, query, rows, problems(rows, bulk)))
+
+    db.prefix = "EXPLAIN FORMAT=JSON "
+    try:
+        for method, args, key_parts in SEEKS:
+            error = _explain(db, method, args)
+            if error:
+                results.append((f"{method} (seek)", None, [], [error]))
+                continue
+            for query, plan_rows in db.plans:
+                rows, found = seek_problems(plan_rows, key_parts)
+                results.append((f"{method} (seek)", query, rows, found))
+    finally:
+        db.prefix = "EXPLAIN "
+    return results
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    db = ExplainDatabase()
+    if not db.connect():
+        return 2
+    try:
+        results = run_checks(db)
+    finally:
+        db.disconnect()
+
+    failed = False
+    for method, query, rows, found in results:
+        status = 'FAIL' if found else 'ok'
+        failed = failed or bool(found)
+        print(f"{status:4}  {method}")
+        for row in rows:
+            print(f"        {row.get('table')}: type={row.get('type')} key={row.get('key')} extra={row.get('Extra')}")
+        for problem in found:
+            print(f"        -> {problem}")
+        if found and query:
+            print(f"        {query}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+Production gunicorn settings
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With PRELOAD_DATA (default on) the app and its read-only data (course
+index, timetable) are loaded once in the master and shared copy-on-write
+by the forked workers; each worker then opens its own database
+connections and warms up before /health reports healthy.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('PRELOAD_DATA', 'true')
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = os.environ['PRELOAD_DATA'].lower() in ('1', 'true', 'yes')
+
+# Dialogflow gives up after ~5s; anything slower than this is a stuck worker
+timeout = 30
+graceful_timeout = 20
+# Dialogflow reuses connections between fulfillment calls
+keepalive = 5
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import webhook
+        webhook.start_worker()
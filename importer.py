@@ -0,0 +1,290 @@
+"""
+Bulk import of course resources and timetables from CSV or JSONL exports
+
+    python importer.py resources canvas_export.csv
+    python importer.py lectures timetable.jsonl --batch-size 2000
+    python importer.py lectures timetable.csv --replace
+
+Rows are streamed from the file, validated, and upserted in batches. Each
+batch is its own short transaction, so live webhook queries are never
+held up for long. Rows are matched on their unique key, so running an
+export twice is safe. With --replace, rows of the programs (or courses)
+in the file that the file no longer has are deleted afterwards, so moved
+lectures and removed resources don't linger. Once every batch is in, the
+courses and programs whose rows actually changed are recorded in
+`data_changes`. Running webhooks pick those up (CHANGE_FEED=true) and drop
+only the affected cached answers.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from mysql.connector import Error
+from database import create_database, WEEKDAYS, DAY_ABBREVIATIONS
+
+logger = logging.getLogger(__name__)
+
+class ValidationError(ValueError):
+    pass
+
+def _text(row, field, max_length, required=True):
+    value = str(row.get(field) or '').strip()
+    if not value:
+        if required:
+            raise ValidationError(f"{field} is required")
+        return None
+    if len(value) > max_length:
+        raise ValidationError(f"{field} is longer than {max_length} characters")
+    return value
+
+def _int(row, field, minimum=1, maximum=None, default=None):
+    value = row.get(field)
+    if value in (None, ''):
+        if default is None:
+            raise ValidationError(f"{field} is required")
+        return default
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        raise ValidationError(f"{field} is not a number: {value!r}")
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ValidationError(f"{field} is out of range: {number}")
+    return number
+
+def _time(row, field):
+    value = _text(row, field, 8)
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%H:%M:%S')
+        except ValueError:
+            continue
+    raise ValidationError(f"{field} is not a time (HH:MM): {value!r}")
+
+def validate_resource(row):
+    """Check one course resource row and return its values in column order"""
+    week_number = _int(row, 'week_number', maximum=60)
+    resource_order = _int(row, 'resource_order', default=1)
+    url = _text(row, 'resource_url', 1024)
+    if not url.isascii():
+        raise ValidationError(f"resource_url must be percent-encoded ASCII: {url!r}")
+    if not url.lower().startswith(('http://', 'https://')):
+        raise ValidationError(f"resource_url is not a web address: {url!r}")
+    return (
+        _text(row, 'course_code', 20).upper(),
+        _text(row, 'course_name', 255),
+        week_number,
+        _text(row, 'resource_title', 255, required=False) or f"Week {week_number} - Resource {resource_order}",
+        url,
+        _text(row, 'resource_type', 50, required=False) or 'lecture_notes',
+        resource_order,
+    )
+
+def validate_lecture(row):
+    """Check one timetable row and return its values in column order"""
+    weekday = _text(row, 'weekday', 10).lower()
+    weekday = DAY_ABBREVIATIONS.get(weekday, weekday)
+    if weekday not in WEEKDAYS:
+        raise ValidationError(f"weekday is not a day name: {weekday!r}")
+    start_time, end_time = _time(row, 'start_time'), _time(row, 'end_time')
+    if end_time <= start_time:
+        raise ValidationError("end_time is not after start_time")
+    return (
+        _text(row, 'program', 100),
+        _int(row, 'year_level', maximum=6),
+        weekday,
+        _text(row, 'course_code', 20).upper(),
+        _text(row, 'title', 255),
+        start_time,
+        end_time,
+        _text(row, 'venue', 100, required=False),
+        _text(row, 'topic', 255, required=False),
+    )
+
+# table, columns, unique key, validator, and what a row changes: (kind, column index)
+DATASETS = {
+    'resources': (
+        'course_resources',
+        ('course_code', 'course_name', 'week_number', 'resource_title', 'resource_url', 'resource_type', 'resource_order'),
+        ('course_code', 'week_number', 'resource_order'),
+        validate_resource,
+        ('course', 0),
+    ),
+    'lectures': (
+        'lectures',
+        ('program', 'year_level', 'weekday', 'course_code', 'title', 'start_time', 'end_time', 'venue', 'topic'),
+        ('program', 'year_level', 'weekday', 'start_time', 'course_code'),
+        validate_lecture,
+        ('program', 0),
+    ),
+}
+
+def _key_value(value):
+    """Compare key values the way the unique key does (case-insensitive, TIME as HH:MM:SS)"""
+    if isinstance(value, timedelta):
+        minutes, seconds = divmod(int(value.total_seconds()), 60)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}"
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+def read_rows(path, fmt=None):
+    """
+    Stream rows from a CSV (header row required) or JSONL file
+
+    Yields:
+        tuple: (line number, row dict)
+    """
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.json', '.ndjson')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValidationError(f"invalid JSON: {e}")
+                continue
+            yield line_number, row if isinstance(row, dict) else ValidationError("not a JSON object")
+
+class Importer:
+    """
+    Validates rows and upserts them in batches of `batch_size`
+
+    Invalid rows are skipped and reported; the import stops after
+    `max_errors` of them. With `replace`, rows of the programs/courses in
+    the file that it doesn't contain are deleted once every batch is in
+    (skipped if any row was invalid, as its slot would be deleted too).
+    Changed courses and programs are recorded once, after the last batch
+    (or after the last committed batch if it stops).
+    """
+
+    def __init__(self, db, dataset, batch_size=500, max_errors=100, replace=False):
+        self.db = db
+        self.table, self.columns, self.keys, self.validate, (self.kind, self.item_column) = DATASETS[dataset]
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.replace = replace
+        self.statement = db.upsert_statement(self.table, self.columns, self.keys)
+        self.courses_statement = db.upsert_statement('courses', ('course_code', 'course_name'), ('course_code',))
+        self.key_columns = [self.columns.index(key) for key in self.keys]
+        self.stats = {'rows': 0, 'imported': 0, 'invalid': 0, 'batches': 0, 'deleted': 0}
+        self.changed = set()
+        # Item as given in the file, and the unique keys the file has for it
+        self.items = {}
+        self.seen = defaultdict(set)
+
+    def _flush(self, batch):
+        with self.db.transaction() as cursor:
+            cursor.executemany(self.statement, batch)
+            changed_rows = cursor.rowcount
+            if self.table == 'course_resources':
+                # Keep the canonical course list in step with the resources
+                courses = sorted({(values[0], values[1]) for values in batch})
+                cursor.executemany(self.courses_statement, courses)
+        self.stats['imported'] += len(batch)
+        self.stats['batches'] += 1
+        if self.replace:
+            for values in batch:
+                item = _key_value(values[self.item_column])
+                self.items.setdefault(item, values[self.item_column])
+                self.seen[item].add(tuple(_key_value(values[index]) for index in self.key_columns))
+        # Upserts count unchanged rows as 0, so re-importing the same export invalidates nothing
+        if changed_rows != 0:
+            self.changed.update((self.kind, values[self.item_column]) for values in batch)
+
+    def _delete_missing(self):
+        """Delete rows of the imported programs/courses that the file doesn't have, one item per transaction"""
+        item_column = self.columns[self.item_column]
+        select = f"SELECT {', '.join(self.keys)} FROM {self.table} WHERE {item_column} = %s"
+        delete = f"DELETE FROM {self.table} WHERE {' AND '.join(f'{key} = %s' for key in self.keys)}"
+        for item, seen in sorted(self.seen.items()):
+            with self.db.transaction() as cursor:
+                cursor.execute(select, (self.items[item],))
+                stale = [
+                    tuple(row[key] for key in self.keys) for row in cursor.fetchall()
+                    if tuple(_key_value(row[key]) for key in self.keys) not in seen
+                ]
+                if stale:
+                    cursor.executemany(delete, stale)
+            if stale:
+                self.stats['deleted'] += len(stale)
+                self.changed.add((self.kind, self.items[item]))
+
+    def run(self, rows):
+        """
+        Import (line number, row) pairs as produced by read_rows
+
+        Returns:
+            dict: Row counts, changed courses/programs and the new data version
+        """
+        started = time.monotonic()
+        batch = []
+        try:
+            for line_number, row in rows:
+                self.stats['rows'] += 1
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    batch.append(self.validate(row))
+                except ValidationError as e:
+                    self.stats['invalid'] += 1
+                    logger.warning("Skipping line %s: %s", line_number, e)
+                    if self.stats['invalid'] > self.max_errors:
+                        raise ValidationError(f"More than {self.max_errors} invalid rows, import stopped")
+                    continue
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = []
+            if batch:
+                self._flush(batch)
+            if self.replace:
+                if self.stats['invalid']:
+                    logger.warning("Not deleting rows missing from the file: %s invalid rows", self.stats['invalid'])
+                else:
+                    self._delete_missing()
+        finally:
+            # Batches already committed must reach the webhooks even if the import stops early
+            version = self.db.record_changes(self.changed)
+        return dict(
+            self.stats,
+            changed=len(self.changed),
+            version=version,
+            seconds=round(time.monotonic() - started, 3),
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import course resources or timetables from CSV/JSONL exports")
+    parser.add_argument('dataset', choices=sorted(DATASETS))
+    parser.add_argument('path', help="CSV (with a header row) or JSONL file")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="default: from the file extension")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('IMPORT_BATCH_SIZE', 500)))
+    parser.add_argument('--max-errors', type=int, default=100, help="stop after this many invalid rows")
+    parser.add_argument('--replace', action='store_true',
+                        help="delete rows of the programs/courses in the file that the file doesn't have")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(levelname)s %(message)s')
+    db = create_database()
+    try:
+        result = Importer(db, args.dataset, args.batch_size, args.max_errors, args.replace).run(read_rows(args.path, args.format))
+    except (Error, ValidationError, OSError) as e:
+        logger.error("Import failed: %s", e)
+        return 1
+    finally:
+        db.disconnect()
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
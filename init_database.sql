@@ -5,17 +5,18 @@ CREATE TABLE IF NOT EXISTS course_resources (
     course_name VARCHAR(255) NOT NULL,
     week_number INT NOT NULL,
     resource_title VARCHAR(255),
-    resource_url TEXT NOT NULL,
+    resource_url VARCHAR(1024) CHARACTER SET ascii NOT NULL,
     resource_type VARCHAR(50) DEFAULT 'lecture_notes',
     resource_order INT DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_course_week (course_code, week_number),
-    INDEX idx_course_name (course_name)
+    -- Covers get_course_resources and get_weeks_for_course, in ORDER BY order
+    INDEX idx_resource_listing (course_code, week_number, resource_order, resource_title, resource_url),
+    UNIQUE INDEX idx_resource_slot (course_code, week_number, resource_order)
 );
 
 -- Insert course resources data
 -- Distributed and Cloud System Programming
-INSERT INTO course_resources (course_code, course_name, week_number, resource_title, resource_url, resource_order) VALUES
+INSERT IGNORE INTO course_resources (course_code, course_name, week_number, resource_title, resource_url, resource_order) VALUES
 ('DCSP', 'Distributed and Cloud System Programming', 1, 'Week 1 - Resource 1', 'https://canvas.wlv.ac.uk/courses/49700/modules/items/2294026', 1),
 ('DCSP', 'Distributed and Cloud System Programming', 1, 'Week 1 - Resource 2', 'https://canvas.wlv.ac.uk/courses/49700/modules/items/2294028', 2),
 ('DCSP', 'Distributed and Cloud System Programming', 2, 'Week 2 - Resource 1', 'https://canvas.wlv.ac.uk/courses/49700/modules/items/2294032', 1),
@@ -59,3 +60,60 @@ INSERT INTO course_resources (course_code, course_name, week_number, resource_ti
 ('DF', 'Digital Forensics', 6, 'Week 6 - Resource 2', 'https://canvas.wlv.ac.uk/courses/49703/modules/items/2419191', 2),
 ('DF', 'Digital Forensics', 7, 'Week 7 - Resource 1', 'https://canvas.wlv.ac.uk/courses/49703/modules/items/2419194', 1),
 ('DF', 'Digital Forensics', 7, 'Week 7 - Resource 2', 'https://canvas.wlv.ac.uk/courses/49703/modules/items/2419195', 2);
+
+
+-- Canonical course list, one row per course code
+CREATE TABLE IF NOT EXISTS courses (
+    course_code VARCHAR(20) PRIMARY KEY,
+    course_name VARCHAR(255) NOT NULL,
+    UNIQUE INDEX idx_courses_name (course_name)
+);
+
+INSERT IGNORE INTO courses (course_code, course_name)
+SELECT DISTINCT course_code, course_name FROM course_resources;
+
+-- Synonyms students use for each course (stored lowercase)
+CREATE TABLE IF NOT EXISTS course_aliases (
+    alias VARCHAR(100) PRIMARY KEY,
+    course_code VARCHAR(20) NOT NULL,
+    INDEX idx_alias_course (course_code)
+);
+
+INSERT IGNORE INTO course_aliases (alias, course_code) VALUES
+('dcsp', 'DCSP'),
+('distributed', 'DCSP'),
+('distributed systems', 'DCSP'),
+('cloud', 'DCSP'),
+('cloud computing', 'DCSP'),
+('db', 'DB'),
+('database', 'DB'),
+('databases', 'DB'),
+('sql', 'DB'),
+('df', 'DF'),
+('forensics', 'DF'),
+('digital forensics', 'DF');
+
+-- Weekly lecture timetable, one row per lecture slot
+CREATE TABLE IF NOT EXISTS lectures (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    program VARCHAR(100) NOT NULL,
+    year_level INT NOT NULL,
+    weekday VARCHAR(10) NOT NULL,
+    course_code VARCHAR(20) NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    venue VARCHAR(100),
+    topic VARCHAR(255),
+    UNIQUE INDEX idx_lecture_slot (program, year_level, weekday, start_time, course_code),
+    -- Covers every lecture query, already sorted by start_time within a day
+    INDEX idx_lecture_day (program, year_level, weekday, start_time, end_time, course_code, title, venue, topic)
+);
+
+-- Courses and programs changed by each import (see importer.py); the highest version is the data version
+CREATE TABLE IF NOT EXISTS data_changes (
+    version INT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    item VARCHAR(255) NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
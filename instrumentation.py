@@ -0,0 +1,205 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+class Metrics:
+    """
+    In-process registry of latency histograms and counters
+
+    Recording is a dictionary lookup and a few integer updates under one
+    lock, cheap enough to run for every phase of every request. `render`
+    produces the Prometheus text exposition format for GET /metrics.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the `with` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def phase(self, phase):
+        """Time one phase of webhook request handling"""
+        return self.timer('webhook_phase_seconds', phase=phase)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def render(self, gauges=None):
+        """
+        Render all metrics in Prometheus text format
+
+        Args:
+            gauges (dict): Extra point-in-time values, e.g. {'pool_in_use': 2}
+        """
+        with self._lock:
+            histograms = [(key, list(h.counts), h.total, h.count) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), counts, total, count in sorted(histograms):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def flatten(prefix, stats):
+    """Turn a nested stats dict into flat numeric gauges named prefix_key_subkey"""
+    gauges = {}
+    for key, value in (stats or {}).items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            gauges.update(flatten(name, value))
+        elif isinstance(value, bool):
+            gauges[name] = int(value)
+        elif isinstance(value, (int, float)):
+            gauges[name] = value
+    return gauges
+
+metrics = Metrics()
+
+def timed_query(method):
+    """Decorator recording the duration of a Database query method"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            metrics.observe('db_query_seconds', time.perf_counter() - started, method=method.__name__)
+    return wrapper
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields go in `extra={'fields': {...}}`"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+_listener = None
+
+def configure_logging(level=None):
+    """
+    Send all log records through a queue drained by a background thread
+
+    Request threads only enqueue records; formatting and stream I/O happen
+    on the listener thread. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level or os.getenv('LOG_LEVEL', 'INFO').upper())
+
+def restart_logging_after_fork():
+    """The listener thread doesn't survive fork; start a new one in the child"""
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+def resident_memory_bytes():
+    """Current resident set size of this process (Linux), or None if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def stop_logging():
+    """Flush queued log records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,126 @@
+from instrumentation import metrics
+
+def context_name(session, name):
+    """Full output context name, e.g. 'projects/p/agent/sessions/s/contexts/awaiting-year'"""
+    return f"{session}/contexts/{name}"
+
+class DialogflowRequest:
+    """
+    A Dialogflow WebhookRequest parsed once into the fields handlers use
+
+    Output contexts are keyed by their short name ('awaiting-year'), so a
+    handler looks one up with a dictionary lookup instead of scanning
+    `outputContexts` and matching substrings of the full names.
+    """
+
+    __slots__ = ('intent', 'action', 'parameters', 'contexts', 'session', 'handler')
+
+    def __init__(self, intent=None, action=None, parameters=None, contexts=None, session=''):
+        self.intent = intent
+        self.action = action
+        self.parameters = parameters if parameters is not None else {}
+        self.contexts = contexts if contexts is not None else {}
+        self.session = session
+        self.handler = None
+
+    @classmethod
+    def parse(cls, body):
+        """
+        Build a request from the decoded webhook JSON
+
+        Args:
+            body (dict): WebhookRequest with `session` and `queryResult`
+
+        Returns:
+            DialogflowRequest
+        """
+        query_result = body.get('queryResult') or {}
+        session = body.get('session') or ''
+        contexts = {}
+        for context in query_result.get('outputContexts') or ():
+            prefix, _, name = context.get('name', '').rpartition('/contexts/')
+            if not name:
+                continue
+            contexts[name] = context.get('parameters') or {}
+            # Older requests without a session field still carry it in context names
+            session = session or prefix
+        return cls(
+            intent=(query_result.get('intent') or {}).get('displayName'),
+            action=query_result.get('action'),
+            parameters=dict(query_result.get('parameters') or {}),
+            contexts=contexts,
+            session=session,
+        )
+
+    def context(self, name):
+        """Parameters of an active context by short name ({} if it isn't active)"""
+        return self.contexts.get(name, {})
+
+def _chain(hook, call_next):
+    def call(request):
+        return hook(request, call_next)
+    return call
+
+def timed(request, call_next):
+    """Middleware recording handler run time per handler"""
+    with metrics.timer('webhook_handler_seconds', handler=request.handler):
+        return call_next(request)
+
+class IntentRegistry:
+    """
+    Maps Dialogflow intent display names and actions to handler functions
+
+    Dispatch is one dictionary lookup on the intent name (then the action),
+    however many intents are registered. Middleware hooks have the signature
+    `hook(request, call_next)` and are composed with each handler once, at
+    registration: registry-wide hooks first, then the handler's own.
+    """
+
+    def __init__(self, middleware=()):
+        self.middleware = list(middleware)
+        self._by_intent = {}
+        self._by_action = {}
+        self._fallback = None
+
+    def _compose(self, handler, middleware):
+        name = handler.__name__
+        call = handler
+        for hook in reversed(self.middleware + list(middleware)):
+            call = _chain(hook, call)
+
+        def dispatch(request):
+            request.handler = name
+            return call(request)
+        return dispatch
+
+    def register(self, *intents, actions=(), middleware=()):
+        """
+        Decorator registering a handler for intent display names and/or actions
+
+        Args:
+            intents (str): Intent display names, e.g. 'Schedule.Query'
+            actions (tuple): Dialogflow actions, e.g. ('query.schedule',)
+            middleware (list): Hooks for this handler only
+        """
+        def decorator(handler):
+            dispatch = self._compose(handler, middleware)
+            for intent in intents:
+                if intent in self._by_intent:
+                    raise ValueError(f"Intent {intent} is already registered")
+                self._by_intent[intent] = dispatch
+            for action in actions:
+                if action in self._by_action:
+                    raise ValueError(f"Action {action} is already registered")
+                self._by_action[action] = dispatch
+            return handler
+        return decorator
+
+    def fallback(self, handler):
+        """Decorator registering the handler for unknown intents"""
+        self._fallback = self._compose(handler, ())
+        return handler
+
+    def dispatch(self, request):
+        """Run the handler for a request's intent (or action, or the fallback)"""
+        handler = self._by_intent.get(request.intent) or self._by_action.get(request.action) or self._fallback
+        return handler(request)
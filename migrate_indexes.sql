@@ -0,0 +1,20 @@
+-- Upgrade an existing database to the indexes in init_database.sql (MySQL 8.0, run once)
+--
+-- Every per-request query in database.py is answered from a covering index
+-- in the order it asks for, so no query reads table rows or sorts.
+-- Check with: python explain_check.py
+
+-- Resource URLs are ASCII (percent-encoded) so the listing index can include them.
+-- The column change rebuilds the table; LOCK=SHARED keeps it readable meanwhile.
+ALTER TABLE course_resources
+    MODIFY resource_url VARCHAR(1024) CHARACTER SET ascii NOT NULL,
+    DROP INDEX idx_course_week,
+    DROP INDEX idx_course_name,
+    ADD INDEX idx_resource_listing (course_code, week_number, resource_order, resource_title, resource_url),
+    ALGORITHM=COPY, LOCK=SHARED;
+
+ALTER TABLE lectures
+    ADD INDEX idx_lecture_day (program, year_level, weekday, start_time, end_time, course_code, title, venue, topic),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ANALYZE TABLE course_resources, lectures, courses, course_aliases, data_changes;
@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+def parse_times(times):
+    """'00:05, 07:30' -> [(0, 5), (7, 30)]"""
+    parsed = []
+    for value in str(times).split(','):
+        value = value.strip()
+        if not value:
+            continue
+        hour, _, minute = value.partition(':')
+        hour, minute = int(hour), int(minute or 0)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid precompute time: {value}")
+        parsed.append((hour, minute))
+    return parsed
+
+class Precomputer:
+    """
+    Renders answers ahead of time and swaps them into the response cache
+
+    `build()` returns (key, version, payload) tuples for every answer worth
+    having warm. A run renders the complete set first and then stores it
+    with one `ResponseCache.put_many`, so requests see either the previous
+    answers or the new ones. Runs are scheduled daily at fixed wall-clock
+    times with APScheduler; a failed run leaves the cache untouched.
+    """
+
+    def __init__(self, build, cache, times='07:30', timezone=None, ttl=7200):
+        self.build = build
+        self.cache = cache
+        self.times = parse_times(times)
+        self.timezone = timezone
+        self.ttl = ttl
+        self.runs = 0
+        self.failures = 0
+        self.entries = 0
+        self.last_run = None
+        self.last_success = None
+        self.last_seconds = None
+        self.last_error = None
+        self._run_lock = threading.Lock()
+        self._scheduler = None
+
+    def run(self):
+        """
+        Render and swap in one complete set of answers
+
+        Returns:
+            bool: True if the new answers were stored
+        """
+        with self._run_lock:
+            started = time.monotonic()
+            self.last_run = time.time()
+            try:
+                count = self.cache.put_many(self.build(), ttl=self.ttl)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                metrics.increment('precompute_runs_total', status='failed')
+                logger.exception("Precompute run failed")
+                return False
+            finally:
+                self.runs += 1
+                self.last_seconds = time.monotonic() - started
+                metrics.observe('precompute_seconds', self.last_seconds)
+
+            self.entries = count
+            self.last_success = self.last_run
+            self.last_error = None
+            metrics.increment('precompute_runs_total', status='ok')
+            if count > self.cache.max_entries:
+                logger.warning("Precomputed answers exceed RESPONSE_CACHE_SIZE; some were evicted",
+                               extra={'fields': {'entries': count, 'max_entries': self.cache.max_entries}})
+            logger.info("Precomputed answers", extra={'fields': {
+                'entries': count,
+                'duration_ms': round(self.last_seconds * 1000, 3)
+            }})
+            return True
+
+    def start(self):
+        """Schedule daily runs in a background thread (requires APScheduler)"""
+        if self._scheduler is not None or not self.times:
+            return
+        from apscheduler.events import EVENT_JOB_MISSED
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.triggers.cron import CronTrigger
+
+        scheduler = BackgroundScheduler(timezone=self.timezone) if self.timezone else BackgroundScheduler()
+        for hour, minute in self.times:
+            scheduler.add_job(
+                self.run,
+                CronTrigger(hour=hour, minute=minute, timezone=scheduler.timezone),
+                id=f"precompute-{hour:02d}{minute:02d}",
+                coalesce=True,
+                max_instances=1,
+                misfire_grace_time=600
+            )
+        scheduler.add_listener(
+            lambda event: metrics.increment('precompute_runs_total', status='missed'),
+            EVENT_JOB_MISSED
+        )
+        scheduler.start()
+        self._scheduler = scheduler
+
+    def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def reset_after_fork(self):
+        """The scheduler thread doesn't survive fork; workers call start() again"""
+        self._run_lock = threading.Lock()
+        self._scheduler = None
+
+    def next_run(self):
+        if self._scheduler is None:
+            return None
+        times = [job.next_run_time for job in self._scheduler.get_jobs() if job.next_run_time]
+        return min(times).timestamp() if times else None
+
+    def stats(self):
+        return {
+            'scheduled': self._scheduler is not None,
+            'runs': self.runs,
+            'failures': self.failures,
+            'entries': self.entries,
+            'last_run': self.last_run,
+            'last_success': self.last_success,
+            'last_seconds': self.last_seconds,
+            'last_error': self.last_error,
+            'next_run': self.next_run(),
+        }
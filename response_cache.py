@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from singleflight import SingleFlight
+from instrumentation import metrics
+
+class ResponseCache:
+    """
+    LRU cache of fully serialized webhook responses
+
+    Entries are stored together with the data version they were rendered
+    from. A lookup with a different version (or an entry older than `ttl`
+    seconds) is a miss, so answers are rebuilt once the underlying rows change.
+    Outdated entries stay around until evicted and can still be served as a
+    last known-good answer through `get_stale`.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Concurrent misses for the same answer render it once
+        self.flight = SingleFlight()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def serialize(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def get(self, key, version):
+        """Return the cached response body, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, body, expires_at, _ = entry
+                if entry_version == version and (expires_at is None or time.monotonic() < expires_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+            self.misses += 1
+            return None
+
+    def _expiry(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl else None
+
+    def _store(self, key, version, body, expires_at, payload):
+        self._entries[key] = (version, body, expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, version, payload, ttl=None):
+        """Serialize and store a response payload, returning the body bytes"""
+        with metrics.phase('serialize'):
+            body = self.serialize(payload)
+        if not self.enabled:
+            return body
+        with self._lock:
+            self._store(key, version, body, self._expiry(ttl), payload)
+        return body
+
+    def put_many(self, entries, ttl=None):
+        """
+        Store several pre-rendered responses at once
+
+        Everything is serialized first and then swapped in under a single
+        lock, so readers never see a partially updated set.
+
+        Args:
+            entries (iterable): (key, version, payload) tuples
+            ttl (float): Lifetime of these entries instead of the cache default
+        """
+        if not self.enabled:
+            return 0
+        serialized = [(key, version, self.serialize(payload), payload) for key, version, payload in entries]
+        expires_at = self._expiry(ttl)
+        with self._lock:
+            for key, version, body, payload in serialized:
+                self._store(key, version, body, expires_at, payload)
+        return len(serialized)
+
+    def get_stale(self, key):
+        """Return the last stored payload for `key` regardless of version or age"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[3] if entry is not None else None
+
+    def get_or_render(self, key, version, render, timeout=None):
+        """
+        Serve a cached response or build it with `render()`
+
+        Args:
+            key (tuple): Cache key identifying the answer
+            version: Data version the answer depends on
+            render (callable): Returns the response payload dict on a miss
+            timeout (float): Longest to wait for an identical render already in flight
+
+        Returns:
+            bytes: Serialized JSON response body
+        """
+        if not self.enabled:
+            return self.flight.do((key, version), lambda: self.serialize(render()), timeout)
+        body = self.get(key, version)
+        if body is None:
+            body = self.flight.do((key, version), lambda: self.put(key, version, render()), timeout)
+        return body
+
+    def invalidate(self, predicate=None):
+        """Drop all entries, or only those whose key matches `predicate`"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def reset_after_fork(self):
+        """Fresh locks for a forked worker; cached entries are kept (shared copy-on-write)"""
+        self._lock = threading.Lock()
+        self.flight = SingleFlight()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
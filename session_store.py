@@ -0,0 +1,150 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class SQLiteProfileBackend:
+    """Persistent student profiles in a local SQLite file (shared by workers on one host)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS student_profiles (
+                session TEXT PRIMARY KEY,
+                program TEXT,
+                year_level INTEGER,
+                updated_at REAL NOT NULL
+            )
+        """)
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def load(self, session):
+        row = self._connection().execute(
+            "SELECT program, year_level, updated_at FROM student_profiles WHERE session = ?", (session,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'program': row[0], 'year_level': row[1]}, row[2]
+
+    def save(self, session, profile, updated_at):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO student_profiles (session, program, year_level, updated_at) VALUES (?, ?, ?, ?)",
+            (session, profile.get('program'), profile.get('year_level'), updated_at)
+        )
+        connection.commit()
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+
+class SessionStore:
+    """
+    Remembers each student's program and year level per Dialogflow session
+
+    Profiles live in a bounded in-memory LRU with a TTL. An optional backend
+    persists them across restarts; it is only read on an in-memory miss and
+    only written when a profile actually changes.
+    """
+
+    def __init__(self, max_entries=10000, ttl=30 * 24 * 3600, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, updated_at):
+        return bool(self.ttl) and time.time() - updated_at > self.ttl
+
+    def get(self, session):
+        """
+        Look up the remembered profile for a session
+
+        Returns:
+            dict: {'program', 'year_level'} or None
+        """
+        if not session:
+            return None
+        with self._lock:
+            entry = self._profiles.get(session)
+            if entry is not None:
+                profile, updated_at = entry
+                if not self._expired(updated_at):
+                    self._profiles.move_to_end(session)
+                    self.hits += 1
+                    return dict(profile)
+                del self._profiles[session]
+
+        loaded = None
+        if self.backend is not None:
+            try:
+                loaded = self.backend.load(session)
+            except sqlite3.Error as e:
+                logger.error("Error loading session profile: %s", e)
+        if loaded is None or self._expired(loaded[1]):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._store(session, *loaded)
+        return dict(loaded[0])
+
+    def remember(self, session, **fields):
+        """Merge non-empty fields into the session's profile"""
+        if not session:
+            return
+        fields = {key: value for key, value in fields.items() if value not in (None, '')}
+        if not fields:
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._profiles.get(session)
+            current = entry[0] if entry is not None and not self._expired(entry[1]) else {}
+            profile = dict(current, **fields)
+            changed = profile != current
+            # The TTL counts from the last change, so unchanged profiles aren't rewritten
+            self._store(session, profile, now if changed else entry[1])
+
+        if changed and self.backend is not None:
+            try:
+                self.backend.save(session, profile, now)
+            except sqlite3.Error as e:
+                logger.error("Error saving session profile: %s", e)
+
+    def _store(self, session, profile, updated_at):
+        self._profiles[session] = (profile, updated_at)
+        self._profiles.move_to_end(session)
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        if self.backend is not None:
+            self.backend.reset_after_fork()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._profiles),
+                'hits': self.hits,
+                'misses': self.misses,
+                'persistent': self.backend is not None,
+            }
@@ -0,0 +1,101 @@
+import functools
+import threading
+import time
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception). Nothing is
+    kept once the call finishes, so a result is never older than the query
+    that produced it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Monitoring counters
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run `fn()` once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identity of the call
+            fn (callable): Work to run if no identical call is in flight
+            timeout (float): Longest a waiting caller blocks for the shared result
+
+        Raises:
+            TimeoutError: if a waiting caller's timeout expires first
+
+        Returns:
+            The value returned by `fn`; shared callers receive the same object,
+            so it must be treated as read-only.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            started = time.monotonic()
+            finished = call.done.wait(timeout)
+            waited = time.monotonic() - started
+            with self._lock:
+                self.shared += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            if not finished:
+                raise TimeoutError(f"Shared call still running after {timeout:.3f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executions += 1
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+                'coalescing_ratio': round(self.shared / self.calls, 4) if self.calls else 0.0,
+                'avg_wait_ms': round(self._wait_total * 1000 / self.shared, 3) if self.shared else 0.0,
+                'max_wait_ms': round(self._wait_max * 1000, 3),
+            }
+
+def coalesced(method):
+    """Method decorator: coalesce concurrent calls with identical arguments via `self.flight`"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return self.flight.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,175 @@
+"""
+Read-only SQLite snapshots of the bot's reference data
+
+Export the MySQL tables into a single SQLite file, then serve every worker
+from that file with DB_BACKEND=snapshot:
+
+    python snapshot.py export uni_bot.snapshot.sqlite3
+    DB_BACKEND=snapshot SNAPSHOT_PATH=uni_bot.snapshot.sqlite3 gunicorn -c gunicorn.conf.py wsgi:app
+
+A new snapshot is written next to the target and moved into place with an
+atomic rename. Running workers notice the new file and reopen it, and
+cached answers built from the old snapshot are rebuilt.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from database import Database
+from sqlite_database import SQLiteDatabase, load_sql_file
+
+logger = logging.getLogger(__name__)
+
+# Tables and columns copied into a snapshot
+SNAPSHOT_TABLES = {
+    'courses': ['course_code', 'course_name'],
+    'course_aliases': ['alias', 'course_code'],
+    'course_resources': ['id', 'course_code', 'course_name', 'week_number', 'resource_title',
+                         'resource_url', 'resource_type', 'resource_order'],
+    'lectures': ['program', 'year_level', 'weekday', 'course_code', 'title',
+                 'start_time', 'end_time', 'venue', 'topic'],
+}
+
+class SnapshotDatabase(SQLiteDatabase):
+    """
+    Database served from an immutable SQLite snapshot file
+
+    Connections open the file with `immutable=1` (no locking or change
+    detection by SQLite) and memory-map it, so every worker process shares
+    the same pages through the OS page cache. Every `check_interval`
+    seconds the file's identity is compared; after an atomic replacement
+    each thread reopens onto the new file and `data_version()` changes.
+    """
+
+    def __init__(self, path=None, check_interval=None):
+        super().__init__(path or os.getenv('SNAPSHOT_PATH', 'uni_bot.snapshot.sqlite3'))
+        self.check_interval = float(check_interval if check_interval is not None
+                                    else os.getenv('SNAPSHOT_CHECK_SECONDS', 5))
+        self.mmap_size = int(os.getenv('SNAPSHOT_MMAP_BYTES', 256 * 1024 * 1024))
+        self.generation = 0
+        self._identity = None
+        self._checked_at = None
+        self._check_lock = threading.Lock()
+
+    def _file_identity(self):
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _check_for_new_snapshot(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._check_lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                identity = self._file_identity()
+            except OSError as e:
+                logger.error("Snapshot %s is not readable: %s", self.path, e)
+                return
+            if identity != self._identity:
+                if self._identity is not None:
+                    logger.info("Snapshot %s replaced, reopening", self.path)
+                self._identity = identity
+                self.generation += 1
+
+    def _open(self):
+        connection = sqlite3.connect(f"file:{os.path.abspath(self.path)}?immutable=1", uri=True,
+                                     check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        connection.execute("PRAGMA query_only = 1")
+        return connection
+
+    def _connection(self):
+        self._check_for_new_snapshot()
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.generation != self.generation:
+            connection.close()
+            connection = None
+        if connection is None:
+            connection = self._local.connection = self._open()
+            self._local.generation = self.generation
+        return connection
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        self._check_lock = threading.Lock()
+
+    def data_version(self):
+        self._check_for_new_snapshot()
+        return self.generation
+
+def _snapshot_value(value):
+    # MySQL TIME columns arrive as timedelta; store them as HH:MM:SS text
+    if isinstance(value, timedelta):
+        minutes, seconds = divmod(int(value.total_seconds()), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return value
+
+def export_snapshot(source, path, sql_file='init_database.sql', batch_size=1000):
+    """
+    Copy the reference tables from `source` into a new snapshot at `path`
+
+    The snapshot is built in a temporary file in the same directory and
+    renamed over `path`, so readers never see a partially written file.
+
+    Returns:
+        dict: Number of rows exported per table
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    temporary = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    counts = {}
+    try:
+        load_sql_file(temporary, sql_file)
+        target = sqlite3.connect(temporary)
+        try:
+            for table, columns in SNAPSHOT_TABLES.items():
+                target.execute(f"DELETE FROM {table}")
+                column_list = ', '.join(columns)
+                insert = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join('?' * len(columns))})"
+                counts[table] = 0
+                with source.cursor() as cursor:
+                    cursor.execute(f"SELECT {column_list} FROM {table}")
+                    rows = cursor.fetchall()
+                for start in range(0, len(rows), batch_size):
+                    batch = rows[start:start + batch_size]
+                    target.executemany(insert, [
+                        tuple(_snapshot_value(row[column]) for column in columns) for row in batch
+                    ])
+                    counts[table] += len(batch)
+            target.commit()
+            target.execute("ANALYZE")
+            target.execute("VACUUM")
+        finally:
+            target.close()
+
+        with open(temporary, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    export = subcommands.add_parser('export', help="Export MySQL reference data into a snapshot file")
+    export.add_argument('path', nargs='?', default=os.getenv('SNAPSHOT_PATH', 'uni_bot.snapshot.sqlite3'))
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        counts = export_snapshot(Database(), args.path)
+        print(f"Wrote {args.path}: " + ', '.join(f"{table}={count}" for table, count in counts.items()))
+
+if __name__ == '__main__':
+    main()
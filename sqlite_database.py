@@ -0,0 +1,189 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from mysql.connector import errors
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCursor:
+    """Adapter giving a sqlite3 cursor the mysql-connector dictionary cursor interface"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace('%s', '?'), params)
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(query.replace('%s', '?'), seq_params)
+
+    def fetchall(self):
+        return [dict(row) for row in self._cursor.fetchall()]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteDatabase(Database):
+    """
+    Database backed by a local SQLite file
+
+    Runs the same queries as the MySQL backend (`%s` placeholders are
+    translated) with one connection per thread. Used as a local stand-in
+    for benchmarks and development.
+    """
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or os.getenv('SQLITE_PATH', 'uni_bot.sqlite3')
+        self._local = threading.local()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return connection
+
+    def connect(self):
+        """Open the SQLite file and verify it is readable"""
+        try:
+            with self.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            logger.info("Using SQLite database %s", self.path)
+            return True
+        except errors.Error as e:
+            logger.error("Error opening SQLite database: %s", e)
+            return False
+
+    def disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def cursor(self):
+        """Yield a dictionary cursor, raising mysql-connector errors like the MySQL backend"""
+        try:
+            connection = self._connection()
+        except sqlite3.Error as e:
+            raise errors.DatabaseError(msg=str(e))
+        return self._cursor(connection)
+
+    @contextmanager
+    def _cursor(self, connection):
+        # Commit and close through the connection the cursor came from; a
+        # newer snapshot only replaces it on the next _connection()
+        self._count_query()
+        try:
+            cursor = connection.cursor()
+        except sqlite3.Error as e:
+            raise errors.DatabaseError(msg=str(e))
+        try:
+            yield SQLiteCursor(cursor)
+            connection.commit()
+        except sqlite3.Error as e:
+            raise errors.DatabaseError(msg=str(e))
+        finally:
+            cursor.close()
+
+    def prepared(self, query):
+        # sqlite3 keeps its own per-connection cache of prepared statements
+        return self.cursor()
+
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor whose statements are committed together, or rolled back on error"""
+        connection = self._connection()
+        try:
+            with self._cursor(connection) as cursor:
+                yield cursor
+        except BaseException:
+            connection.rollback()
+            raise
+
+    def upsert_statement(self, table, columns, keys):
+        updates = [column for column in columns if column not in keys] or list(keys[:1])
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            f"{', '.join(f'{column} = excluded.{column}' for column in updates)} "
+            # Like MySQL, leave identical rows alone so they don't count as changed
+            f"WHERE {' OR '.join(f'{column} IS NOT excluded.{column}' for column in updates)}"
+        )
+
+    def warm_up(self, connections=1):
+        self._connection()
+        return 1
+
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        self._local = threading.local()
+
+    def pool_stats(self):
+        return {}
+
+def mysql_to_sqlite(script):
+    """
+    Translate the MySQL DDL/DML used in init_database.sql into SQLite statements
+
+    Inline INDEX clauses become separate CREATE INDEX statements,
+    AUTO_INCREMENT keys become INTEGER PRIMARY KEY, VARCHAR columns compare
+    case-insensitively like MySQL's default collation (character sets are
+    dropped) and INSERT IGNORE becomes INSERT OR IGNORE.
+    """
+    script = re.sub(r'--[^\n]*', '', script)
+    statements = []
+    for statement in script.split(';'):
+        statement = statement.strip()
+        if not statement:
+            continue
+        table = re.match(r'CREATE TABLE(?: IF NOT EXISTS)? (\w+)', statement, re.IGNORECASE)
+        if table:
+            indexes = []
+            columns = []
+            for line in statement[statement.index('(') + 1:statement.rindex(')')].split('\n'):
+                line = line.strip().rstrip(',')
+                index = re.match(r'(UNIQUE )?(?:INDEX|KEY) (\w+) \((.+)\)', line, re.IGNORECASE)
+                if index:
+                    unique = 'UNIQUE ' if index.group(1) else ''
+                    indexes.append(
+                        f"CREATE {unique}INDEX IF NOT EXISTS {index.group(2)} ON {table.group(1)} ({index.group(3)})"
+                    )
+                elif line:
+                    line = re.sub(r'INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT',
+                                  line, flags=re.IGNORECASE)
+                    line = re.sub(r' CHARACTER SET \w+', '', line, flags=re.IGNORECASE)
+                    columns.append(re.sub(r'(VARCHAR\(\d+\))', r'\1 COLLATE NOCASE', line, flags=re.IGNORECASE))
+            statements.append(f"CREATE TABLE IF NOT EXISTS {table.group(1)} (\n    " + ',\n    '.join(columns) + "\n)")
+            statements.extend(indexes)
+        else:
+            statements.append(re.sub(r'^INSERT IGNORE', 'INSERT OR IGNORE', statement, flags=re.IGNORECASE))
+    return statements
+
+def load_sql_file(path, sql_file='init_database.sql'):
+    """Create (or extend) a SQLite database from a MySQL initialization script"""
+    with open(sql_file, encoding='utf-8') as f:
+        statements = mysql_to_sqlite(f.read())
+    connection = sqlite3.connect(path)
+    try:
+        for statement in statements:
+            connection.execute(statement)
+        connection.commit()
+    finally:
+        connection.close()
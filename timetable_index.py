@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+class TimetableIndex:
+    """
+    In-memory copy of the `lectures` table keyed by (program, year_level, weekday)
+
+    Each key maps to an immutable tuple of lectures already sorted by start
+    time. A refresh builds a complete new index and swaps it in with a single
+    assignment, so readers always see either the old or the new snapshot.
+    """
+
+    def __init__(self, db, refresh_interval=0):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.loaded_at = None
+        self._index = None
+        self._lecture_count = 0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def key(program, year_level, weekday):
+        """Normalize lookup values the same way MySQL's case-insensitive match does"""
+        return (str(program).strip().lower(), int(year_level), str(weekday).strip().lower())
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def refresh(self):
+        """
+        Reload the whole timetable and atomically replace the current index
+
+        Returns:
+            bool: True if the timetable was reloaded
+        """
+        with self._refresh_lock:
+            try:
+                rows = self.db.get_all_lectures()
+            except Error as e:
+                logger.error("Error refreshing timetable index: %s", e)
+                return False
+
+            index = self._build(rows)
+
+            # Unchanged data keeps its version, so answers cached from it stay valid
+            if index != self._index:
+                self._index = index
+                self.version += 1
+            self._lecture_count = len(rows)
+            self.loaded_at = time.time()
+            return True
+
+    def refresh_programs(self, programs):
+        """
+        Reload only the given programs and swap in the patched index
+
+        The version is left alone; callers drop cached answers for these
+        programs themselves, so answers for other programs stay cached.
+
+        Returns:
+            bool: True if the programs were reloaded
+        """
+        with self._refresh_lock:
+            if self._index is None:
+                return False
+            try:
+                rows = self.db.get_lectures_for_programs(tuple(programs))
+            except Error as e:
+                logger.error("Error refreshing timetable programs: %s", e)
+                return False
+
+            changed = {str(program).strip().lower() for program in programs}
+            index = {key: lectures for key, lectures in self._index.items() if key[0] not in changed}
+            index.update(self._build(rows))
+            self._index = index
+            self._lecture_count = sum(len(lectures) for lectures in index.values())
+            self.loaded_at = time.time()
+            return True
+
+    def _build(self, rows):
+        buckets = defaultdict(list)
+        for row in rows:
+            key = self.key(row['program'], row['year_level'], row['weekday'])
+            buckets[key].append({
+                'course_code': row['course_code'],
+                'title': row['title'],
+                'start_time': row['start_time'],
+                'end_time': row['end_time'],
+                'venue': row['venue'],
+                'topic': row['topic'],
+                'weekday': key[2],
+            })
+        return {
+            key: tuple(sorted(lectures, key=lambda lecture: lecture['start_time']))
+            for key, lectures in buckets.items()
+        }
+
+    def get_lectures(self, program, year_level, weekday):
+        """
+        Look up lectures without touching the database
+
+        Returns:
+            tuple: Lectures sorted by start time, or None if no snapshot is loaded yet
+        """
+        index = self._index
+        if index is None:
+            return None
+        return index.get(self.key(program, year_level, weekday), ())
+
+    def get_lectures_for_days(self, program, year_level, weekdays):
+        """
+        Look up several days at once without touching the database
+
+        Returns:
+            dict: Weekday -> tuple of lectures, or None if no snapshot is loaded yet
+        """
+        index = self._index
+        if index is None:
+            return None
+        return {day: index.get(self.key(program, year_level, day), ()) for day in weekdays}
+
+    def start(self, refresh_now=True):
+        """Load in the background and keep refreshing every `refresh_interval` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(refresh_now,), name='timetable-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reset_after_fork(self):
+        """Drop the parent's refresh thread state; the loaded snapshot is kept (shared copy-on-write)"""
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self, refresh_now):
+        if refresh_now:
+            self.refresh()
+        while self.refresh_interval > 0 and not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def program_years(self):
+        """(program, year_level) pairs in the loaded snapshot, or None if none is loaded"""
+        index = self._index
+        if index is None:
+            return None
+        return sorted({key[:2] for key in index})
+
+    def stats(self):
+        index = self._index
+        return {
+            'loaded': index is not None,
+            'version': self.version,
+            'keys': len(index) if index else 0,
+            'lectures': self._lecture_count,
+            'loaded_at': self.loaded_at,
+        }
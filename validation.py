@@ -0,0 +1,240 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from mysql.connector import Error
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+YEAR_WORDS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6}
+MAX_YEAR_LEVEL = 6
+
+def parse_year_level(value):
+    """
+    Read a year level from a Dialogflow parameter
+
+    Args:
+        value: Number or text, e.g. 2, 2.0, '2', '2nd', 'second', 'year 2', '2nd year'
+
+    Returns:
+        int: Year level from 1 to MAX_YEAR_LEVEL, or None if the value isn't one
+    """
+    text = ' '.join(str(value).lower().replace('year', ' ').split())
+    match = re.fullmatch(r'(\d+)(?:\.0+)?(?:st|nd|rd|th)?', text)
+    number = int(match.group(1)) if match else YEAR_WORDS.get(text)
+    if number is None or not 1 <= number <= MAX_YEAR_LEVEL:
+        return None
+    return number
+
+class NegativeCache:
+    """
+    Bounded LRU of requests known to have nothing to show
+
+    Only the key and a short reason are stored, so it remembers far more
+    misses than the response cache holds answers, without pushing real
+    answers out. Entries carry the data version they were seen with and
+    expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=4096, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        """Return the reason `key` is known to be empty, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, reason, expires_at = entry
+                if entry_version == version and (expires_at is None or time.monotonic() < expires_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return reason
+            self.misses += 1
+            return None
+
+    def put(self, key, version, reason):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (version, reason, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Drop all entries, or only those whose key matches `predicate`"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+class Validator:
+    """
+    Known parameter domains: programs, their year levels and teaching days,
+    and the weeks each course has resources for
+
+    Loaded with two small DISTINCT queries and swapped in as one snapshot, so
+    requests for things that don't exist are answered without a database
+    query. Until a snapshot is loaded every check passes and requests take
+    the normal path. The domains are reloaded in the background every
+    `refresh_interval` seconds and whenever `db.data_version()` moves, so an
+    import doesn't leave new weeks or programs rejected until the next reload.
+    """
+
+    def __init__(self, db, refresh_interval=900, retry_interval=30):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.version = 0
+        self.loaded_at = None
+        self._failed_at = None
+        self._data_version = None
+        self.deflected = 0
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def reset_after_fork(self):
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Reload the domains from the database
+
+        Returns:
+            bool: True if they were reloaded; on failure the previous snapshot is kept
+        """
+        with self._refresh_lock:
+            # Read first: a change landing during the load triggers another one
+            data_version = self.db.data_version()
+            try:
+                day_rows = self.db.get_timetable_days()
+                week_rows = self.db.get_resource_weeks()
+            except Error as e:
+                logger.error("Error loading validation domains: %s", e)
+                self._failed_at = time.monotonic()
+                return False
+
+            programs = {}
+            days = defaultdict(set)
+            for row in day_rows:
+                program = str(row['program']).strip()
+                programs.setdefault(program.lower(), program)
+                days[(program.lower(), int(row['year_level']))].add(str(row['weekday']).lower())
+            weeks = defaultdict(set)
+            for row in week_rows:
+                weeks[row['course_code']].add(int(row['week_number']))
+
+            snapshot = (
+                programs,
+                {key: frozenset(value) for key, value in days.items()},
+                {code: tuple(sorted(value)) for code, value in weeks.items()},
+            )
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                self.version += 1
+            self.loaded_at = time.monotonic()
+            self._data_version = data_version
+            self._failed_at = None
+            return True
+
+    def _current(self):
+        if self._snapshot is None:
+            # As CourseResolver: don't retry a failed load on every request
+            if ((self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_interval)
+                    and not self._refresh_lock.locked()):
+                self.refresh()
+        elif (((self.refresh_interval and time.monotonic() - self.loaded_at > self.refresh_interval)
+               or self.db.data_version() != self._data_version)
+              and not self._refresh_lock.locked()):
+            threading.Thread(target=self.refresh, name='validation-refresh', daemon=True).start()
+        return self._snapshot
+
+    def programs(self):
+        """Names of the programs that have a timetable"""
+        snapshot = self._current()
+        return sorted(snapshot[0].values()) if snapshot else []
+
+    def find_program(self, program):
+        """
+        Canonical name of a program (matched case-insensitively)
+
+        Returns:
+            str: The program name, `program` itself if no domains are loaded,
+                or None if it has no timetable
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return program
+        return snapshot[0].get(str(program).strip().lower())
+
+    def years(self, program):
+        """Year levels with a timetable for a program ([] if none or not loaded)"""
+        snapshot = self._current()
+        if snapshot is None:
+            return []
+        program = str(program).strip().lower()
+        return sorted(year for key_program, year in snapshot[1] if key_program == program)
+
+    def teaching_days(self, program, year_level):
+        """
+        Weekdays with lectures for a program and year
+
+        Returns:
+            frozenset: Weekday names, or None if no domains are loaded
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        return snapshot[1].get((str(program).strip().lower(), int(year_level)), frozenset())
+
+    def weeks(self, course_code):
+        """
+        Weeks a course has resources for
+
+        Returns:
+            tuple: Sorted week numbers, or None if no domains are loaded
+        """
+        snapshot = self._current()
+        if snapshot is None:
+            return None
+        return snapshot[2].get(course_code, ())
+
+    def deflect(self, reason):
+        """Count a request answered here instead of by a database query"""
+        self.deflected += 1
+        metrics.increment('validation_deflected_total', reason=reason)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'version': self.version,
+            'programs': len(snapshot[0]) if snapshot else 0,
+            'courses': len(snapshot[2]) if snapshot else 0,
+            'deflected': self.deflected,
+        }
@@ -1,18 +1,299 @@
-from flask import Flask, request, jsonify
-from database import Database
-from datetime import datetime
+from flask import Flask, request, jsonify, g, has_request_context
+from mysql.connector import Error
+from database import create_database, WEEKDAYS, TIMEZONE
+from timetable_index import TimetableIndex
+from response_cache import ResponseCache
+from course_resolver import CourseResolver, normalize
+from deadline import DeadlineExecutor
+from session_store import SessionStore, SQLiteProfileBackend
+from precompute import Precomputer
+from change_feed import ChangeFeed
+from intents import DialogflowRequest, IntentRegistry, timed, context_name
+from validation import Validator, NegativeCache, parse_year_level
+from instrumentation import (
+    metrics, flatten, configure_logging, restart_logging_after_fork, resident_memory_bytes
+)
+from datetime import datetime, timedelta
+from functools import lru_cache
+import gc
+import hmac
+import json
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def env_flag(name, default='false'):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
 
 app = Flask(__name__)
-db = Database()
+db = create_database()
+
+# Optional in-memory timetable: schedule answers are served without DB I/O
+timetable = None
+if env_flag('TIMETABLE_INDEX'):
+    timetable = TimetableIndex(db, refresh_interval=float(os.getenv('TIMETABLE_REFRESH_SECONDS', 900)))
+
+def get_lectures(program, year_level, weekday):
+    """Get lectures from the timetable index when loaded, otherwise from MySQL"""
+    if timetable is not None:
+        lectures = timetable.get_lectures(program, year_level, weekday)
+        if lectures is not None:
+            return lectures
+    return db.get_lectures_by_day(program, year_level, weekday)
+
+def get_lectures_for_days(program, year_level, weekdays):
+    """Get lectures for several days with one index lookup or one grouped query"""
+    if timetable is not None:
+        lectures_by_day = timetable.get_lectures_for_days(program, year_level, weekdays)
+        if lectures_by_day is not None:
+            return lectures_by_day
+    return db.get_lectures_for_days(program, year_level, tuple(weekdays))
+
+# Course names and aliases, matched in memory instead of LIKE scans
+course_resolver = CourseResolver(db, refresh_interval=float(os.getenv('COURSE_REFRESH_SECONDS', 900)))
+
+# Final answers serialized once and reused until the data version changes
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('RESPONSE_CACHE_TTL', 300))
+)
+
+# Optional per-session memory of program/year so returning students skip the prompts
+session_store = None
+if env_flag('SESSION_STORE'):
+    session_store = SessionStore(
+        max_entries=int(os.getenv('SESSION_STORE_SIZE', 10000)),
+        ttl=float(os.getenv('SESSION_STORE_TTL', 30 * 24 * 3600)),
+        backend=SQLiteProfileBackend(os.getenv('SESSION_DB_PATH')) if os.getenv('SESSION_DB_PATH') else None
+    )
+
+# Known programs, years, teaching days and course weeks, plus recent empty
+# lookups: requests for things that don't exist skip the database
+validator = None
+negative_cache = None
+if env_flag('VALIDATION', 'true'):
+    validator = Validator(db, refresh_interval=float(os.getenv('VALIDATION_REFRESH_SECONDS', 900)))
+    negative_cache = NegativeCache(
+        max_entries=int(os.getenv('NEGATIVE_CACHE_SIZE', 4096)),
+        ttl=float(os.getenv('NEGATIVE_CACHE_TTL', 600))
+    )
+
+# Optional: follow importer.py's change log and drop only the affected answers
+change_feed = None
+if env_flag('CHANGE_FEED'):
+    change_feed = ChangeFeed(db, interval=float(os.getenv('CHANGE_FEED_SECONDS', 10)))
+
+def apply_data_changes(changes):
+    """Reload and uncache only the courses and programs an import changed"""
+    caches = [response_cache] if negative_cache is None else [response_cache, negative_cache]
+    if validator is not None:
+        validator.refresh()
+    courses = changes.get('course', set())
+    if courses:
+        # New or renamed courses must be resolvable
+        course_resolver.refresh()
+        for cache in caches:
+            cache.invalidate(lambda key: key[0] == 'resources' and key[1] in courses)
+    programs = changes.get('program', set())
+    if programs:
+        if timetable is not None:
+            timetable.refresh_programs(programs)
+        lowered = {program.strip().lower() for program in programs}
+        for cache in caches:
+            cache.invalidate(lambda key: key[0] == 'schedule' and key[1] in lowered)
+
+if change_feed is not None:
+    change_feed.subscribe(apply_data_changes)
+    # The feed drops exactly the changed answers; a global version bump would drop them all
+    db.data_version_interval = 0
 
-def format_time(time_str):
+# Dialogflow abandons the call after ~5s; DB work must finish inside this budget
+TIME_BUDGET = float(os.getenv('WEBHOOK_TIME_BUDGET', 4.0))
+deadline = DeadlineExecutor(max_workers=int(os.getenv('WEBHOOK_DB_WORKERS', 16)))
+
+# Set once this process has warmed up; /health reports 503 until then
+ready = threading.Event()
+ready.set()
+warmup_seconds = None
+
+def preload_data():
+    """Load read-only data into memory (before fork, workers then share it copy-on-write)"""
+    course_resolver.refresh()
+    if validator is not None:
+        validator.refresh()
+    if timetable is not None:
+        timetable.refresh()
+    if precomputer is not None:
+        precomputer.run()
+
+def warm_up():
+    """Open database connections and load in-memory data, then report healthy"""
+    global warmup_seconds
+    started = time.monotonic()
+    db.warm_up(int(os.getenv('DB_POOL_WARM', 1)))
+    if not course_resolver.loaded:
+        course_resolver.refresh()
+    if validator is not None and not validator.loaded:
+        validator.refresh()
+    if timetable is not None:
+        if not timetable.loaded:
+            timetable.refresh()
+        timetable.start(refresh_now=False)
+    if change_feed is not None:
+        change_feed.start()
+    if precomputer is not None:
+        if precomputer.last_success is None:
+            precomputer.run()
+        precomputer.start()
+    warmup_seconds = time.monotonic() - started
+    ready.set()
+    logger.info("Worker ready", extra={'fields': {
+        'pid': os.getpid(),
+        'warmup_ms': round(warmup_seconds * 1000, 3),
+        'rss_bytes': resident_memory_bytes()
+    }})
+
+def start_worker():
+    """Per-process start-up: warm up in the background while /health reports 'starting'"""
+    ready.clear()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def _after_fork_in_child():
+    # Threads, locks and sockets inherited from the parent are not usable here
+    db.reset_after_fork()
+    course_resolver.reset_after_fork()
+    response_cache.reset_after_fork()
+    deadline.reset_after_fork()
+    metrics.reset_after_fork()
+    if timetable is not None:
+        timetable.reset_after_fork()
+    if session_store is not None:
+        session_store.reset_after_fork()
+    if precomputer is not None:
+        precomputer.reset_after_fork()
+    if change_feed is not None:
+        change_feed.reset_after_fork()
+    if validator is not None:
+        validator.reset_after_fork()
+        negative_cache.reset_after_fork()
+    restart_logging_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def create_app(preload=None):
+    """
+    Application factory
+    
+    Args:
+        preload (bool): Load read-only data now, in a process that will fork
+            workers (gunicorn preload_app); each worker must then call
+            start_worker() after fork, as gunicorn.conf.py does. Defaults to
+            the PRELOAD_DATA environment flag. Without preloading, this
+            process warms up and serves requests itself.
+    
+    Returns:
+        Flask: The webhook application
+    """
+    configure_logging()
+    if preload is None:
+        preload = env_flag('PRELOAD_DATA')
+    
+    if preload:
+        preload_data()
+        # Don't hand open sockets to forked workers
+        db.disconnect()
+        # Keep preloaded objects out of GC passes that would touch (and copy) their pages
+        gc.freeze()
+    else:
+        start_worker()
+    return app
+
+# Resources per "all weeks" answer; "more" continues from the last one shown
+RESOURCES_PAGE_SIZE = int(os.getenv('RESOURCES_PAGE_SIZE', 10))
+
+# Cached answers are shared between sessions, so output context names in them
+# use this placeholder and are bound to the caller's session on the way out
+SESSION_PLACEHOLDER = '__SESSION__'
+
+def bind_session(response, session):
+    """
+    Replace the session placeholder in an answer's output context names
+    
+    Without a session there is nothing to name contexts after, so the
+    answer goes out without them rather than with malformed names.
+    """
+    if not session:
+        if isinstance(response, bytes):
+            response = json.loads(response)
+        return {key: value for key, value in response.items() if key != 'outputContexts'}
+    if isinstance(response, bytes):
+        # The placeholder sits inside a JSON string, so the session goes in escaped
+        escaped = json.dumps(session, ensure_ascii=False)[1:-1]
+        return response.replace(SESSION_PLACEHOLDER.encode(), escaped.encode('utf-8'))
+    if response.get('outputContexts'):
+        return dict(response, outputContexts=[
+            dict(context, name=context['name'].replace(SESSION_PLACEHOLDER, session))
+            for context in response['outputContexts']
+        ])
+    return response
+
+STALE_NOTICE = "\n\n⚠️ I couldn't load the latest information just now, so this may be out of date."
+
+def remaining_budget():
+    """Seconds left before the current request's deadline"""
+    if has_request_context() and 'deadline' in g:
+        return g.deadline - time.monotonic()
+    return TIME_BUDGET
+
+def with_deadline(fn, *args):
+    """Run a database call off the request thread within the remaining budget"""
+    return deadline.run(lambda: fn(*args), remaining_budget())
+
+def answer(key, version, render):
+    """
+    Serve a cacheable answer within the request's time budget
+    
+    Falls back to the last known-good copy of the answer, marked as possibly
+    stale, when the budget runs out or a query fails before a fresh one is ready.
+    """
+    budget = remaining_budget()
+    try:
+        return response_cache.get_or_render(key, version, lambda: deadline.run(render, budget), timeout=budget)
+    except (TimeoutError, Error):
+        payload = response_cache.get_stale(key)
+        if payload is None:
+            raise
+        if has_request_context():
+            g.outcome = 'stale'
+        return dict(payload, fulfillmentText=payload['fulfillmentText'] + STALE_NOTICE)
+
+def schedule_version():
+    """Data version of schedule answers (bumped on every timetable refresh or new snapshot)"""
+    return (timetable.version if timetable is not None else 0, db.data_version())
+
+def resources_version():
+    """Data version of resource answers"""
+    return db.data_version()
+
+def format_time(time_value):
     """Convert 24hr time to 12hr format"""
+    if isinstance(time_value, timedelta):
+        # MySQL TIME columns arrive as timedelta; avoid a strptime round-trip
+        hour, minute = divmod(int(time_value.total_seconds()) // 60 % (24 * 60), 60)
+        return f"{hour % 12 or 12:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+    return _format_time_str(str(time_value))
+
+@lru_cache(maxsize=256)
+def _format_time_str(time_str):
     try:
-        time_obj = datetime.strptime(str(time_str), '%H:%M:%S')
+        time_obj = datetime.strptime(time_str, '%H:%M:%S')
         return time_obj.strftime('%I:%M %p')
-    except:
-        return str(time_str)
+    except ValueError:
+        return time_str
 
 def format_lectures_response(lectures, program, year_level, day_name):
     """Format lectures into a readable response"""
@@ -21,24 +302,62 @@ def format_lectures_response(lectures, program, year_level, day_name):
     
     # Build response
     day_display = day_name.capitalize()
-    response = f"Here are your lectures for {day_display}:\n\n"
+    separator = '=' * 50
+    parts = [f"Here are your lectures for {day_display}:\n\n"]
     
     for idx, lecture in enumerate(lectures, 1):
         start = format_time(lecture['start_time'])
         end = format_time(lecture['end_time'])
         
-        response += f"{'='*50}\n"
-        response += f"LECTURE {idx}: {lecture['title']} ({lecture['course_code']})\n"
-        response += f"Time: {start} - {end}\n"
-        response += f"Venue: {lecture['venue']}\n"
-        response += f"Topic: {lecture['topic']}\n"
-        response += f"{'='*50}\n\n"
+        parts.append(
+            f"{separator}\n"
+            f"LECTURE {idx}: {lecture['title']} ({lecture['course_code']})\n"
+            f"Time: {start} - {end}\n"
+            f"Venue: {lecture['venue']}\n"
+            f"Topic: {lecture['topic']}\n"
+            f"{separator}\n\n"
+        )
+    
+    return ''.join(parts).strip()
+
+def describe_days(days):
+    """'Monday to Friday' for consecutive days, 'Monday, Wednesday and Friday' otherwise"""
+    names = [day.capitalize() for day in days]
+    if len(names) > 2 and all(
+        (WEEKDAYS.index(b) - WEEKDAYS.index(a)) % 7 == 1 for a, b in zip(days, days[1:])
+    ):
+        return f"{names[0]} to {names[-1]}"
+    return ", ".join(names[:-1]) + f" and {names[-1]}" if len(names) > 1 else names[0]
+
+def format_days_response(lectures_by_day, days):
+    """Format lectures for several days into one response, split per day"""
+    period = describe_days(days)
+    if not any(lectures_by_day.get(day) for day in days):
+        return f"You don't have any lectures scheduled for {period}. 📅\n\nEnjoy your free time! 🎉"
+    
+    separator = '=' * 50
+    parts = [f"Here are your lectures for {period}:\n\n"]
     
-    return response.strip()
+    for day in days:
+        lectures = lectures_by_day.get(day)
+        parts.append(f"{separator}\n📅 {day.upper()}\n{separator}\n")
+        if not lectures:
+            parts.append("No lectures 🎉\n\n")
+            continue
+        for lecture in lectures:
+            parts.append(
+                f"{format_time(lecture['start_time'])} - {format_time(lecture['end_time'])}: "
+                f"{lecture['title']} ({lecture['course_code']})\n"
+                f"Venue: {lecture['venue']} | Topic: {lecture['topic']}\n\n"
+            )
+    
+    return ''.join(parts).strip()
 
-def format_resources_response(resources, course_name, week_number=None):
+def format_resources_response(resources, course_name, week_number=None, continued=False):
     """Format course resources into a readable response"""
     if not resources:
+        if continued:
+            return f"That's all the resources for {course_name}. 📚"
         if week_number:
             return f"Sorry, I couldn't find any resources for {course_name} - Week {week_number}. 📚"
         else:
@@ -46,26 +365,180 @@ def format_resources_response(resources, course_name, week_number=None):
     
     # Build response
     if week_number:
-        response = f"Here are the resources for {course_name} - Week {week_number}:\n\n"
+        parts = [f"Here are the resources for {course_name} - Week {week_number}:\n\n"]
+    elif continued:
+        parts = [f"Here are more resources for {course_name}:\n\n"]
     else:
-        response = f"Here are all the resources for {course_name}:\n\n"
+        parts = [f"Here are all the resources for {course_name}:\n\n"]
     
+    separator = '=' * 50
     current_week = None
     for resource in resources:
         # Add week header if changed
         if current_week != resource['week_number']:
             current_week = resource['week_number']
-            response += f"\n{'='*50}\n"
-            response += f"WEEK {current_week}\n"
-            response += f"{'='*50}\n"
+            parts.append(f"\n{separator}\nWEEK {current_week}\n{separator}\n")
         
         title = resource.get('resource_title', f"Resource {resource['resource_order']}")
-        response += f"{title}\n"
-        response += f"{resource['resource_url']}\n\n"
+        parts.append(f"{title}\n{resource['resource_url']}\n\n")
     
-    return response.strip()
+    return ''.join(parts).strip()
+
+def encode_page_cursor(resource):
+    """Continuation token for the page after `resource`: 'week.order'"""
+    return f"{resource['week_number']}.{resource['resource_order']}"
+
+def decode_page_cursor(token):
+    """(week_number, resource_order) from a continuation token, or None if it isn't one"""
+    try:
+        week_number, resource_order = str(token).split('.')
+        return int(week_number), int(resource_order)
+    except ValueError:
+        return None
 
-def handle_schedule_query(parameters, contexts):
+def resources_page_payload(course_code, course_name, resources, after=None):
+    """
+    Answer showing one page of a course's resources
+    
+    Args:
+        resources (list): Up to RESOURCES_PAGE_SIZE + 1 resources; an extra
+            one means there is another page
+        after (str): Continuation token this page starts after, None for the first page
+    """
+    page = resources[:RESOURCES_PAGE_SIZE]
+    has_more = len(resources) > RESOURCES_PAGE_SIZE
+    text = format_resources_response(page, course_name, continued=after is not None)
+    parameters = {'course_code': course_code, 'course_name': course_name}
+    if has_more:
+        text += "\n\nSay 'more' to see the next resources."
+        parameters['cursor'] = encode_page_cursor(page[-1])
+    return {
+        'fulfillmentText': text,
+        'outputContexts': [
+            {
+                'name': context_name(SESSION_PLACEHOLDER, 'resources-more'),
+                # Lifespan 0 ends the continuation after the last page
+                'lifespanCount': 2 if has_more else 0,
+                'parameters': parameters
+            }
+        ]
+    }
+
+def render_resources_page(course_code, course_name, after=None):
+    """Fetch and format the page of resources after continuation token `after`"""
+    resources = db.get_course_resources_page(
+        course_code, decode_page_cursor(after) if after else None, RESOURCES_PAGE_SIZE + 1
+    )
+    with metrics.phase('format'):
+        return resources_page_payload(course_code, course_name, resources, after)
+
+def resources_page(course_code, course_name):
+    """Serve the first page of a course's resources through the response cache"""
+    key = ('resources', course_code, None, None)
+    return answer(key, resources_version(), lambda: render_resources_page(course_code, course_name))
+
+def deflect(reason, response):
+    """Count an answer given without a database query and return it"""
+    if validator is not None:
+        validator.deflect(reason)
+    return response
+
+def known_empty(key, version):
+    """True if a lookup for `key` came back empty recently (same data version)"""
+    return negative_cache is not None and negative_cache.get(key, version) is not None
+
+def remember_empty(key, version, reason):
+    if negative_cache is not None:
+        negative_cache.put(key, version, reason)
+
+def ask_for_year(program, day_query, session, prompt):
+    """Prompt for the year level, keeping the program and day for the next turn"""
+    return {
+        'fulfillmentText': prompt,
+        'outputContexts': [
+            {
+                'name': context_name(session, 'awaiting-year'),
+                'lifespanCount': 5,
+                'parameters': {
+                    'program': program,
+                    'day_query': day_query
+                }
+            }
+        ]
+    }
+
+def ask_for_week(course_name, weeks, session, prompt):
+    """Prompt for a week, listing the weeks the course has materials for"""
+    week_list = ", ".join([f"Week {w}" for w in weeks])
+    return {
+        'fulfillmentText': f"{prompt}\n\nAvailable: {week_list}\n\nOr say 'all weeks' to see everything.",
+        'outputContexts': [
+            {
+                'name': context_name(session, 'awaiting-week'),
+                'lifespanCount': 5,
+                'parameters': {
+                    'course_name': course_name
+                }
+            }
+        ]
+    }
+
+def validate_schedule(program, year_level, given_year, days, day_query, session):
+    """
+    Answer schedule requests that can't have any lectures without looking them up
+    
+    Args:
+        year_level (int): Parsed year level, None if `given_year` isn't one
+        days (list): Weekday names from get_day_names
+    
+    Returns:
+        dict: The answer, or None if the lectures have to be looked up
+    """
+    if year_level is None:
+        return deflect('bad_year', ask_for_year(
+            program, day_query, session,
+            f"Sorry, '{given_year}' isn't a year level I know. 🎓\n\nWhat year level are you in? (1st, 2nd, 3rd, or 4th year)"
+        ))
+    if any(day not in WEEKDAYS for day in days):
+        return deflect('bad_day', {
+            'fulfillmentText': f"Sorry, I'm not sure which day '{day_query}' is. 📅\n\nTry 'today', 'tomorrow', a day like 'Monday', or 'this week'."
+        })
+    
+    programs = validator.programs() if validator is not None else []
+    if not programs:
+        # No domains loaded: nothing to check against
+        return None
+    if validator.find_program(program) is None:
+        program_list = "\n".join([f"• {name}" for name in programs])
+        return deflect('unknown_program', {
+            'fulfillmentText': f"Sorry, I don't have a timetable for '{program}'. 🎓\n\nWhich program are you studying?\n\n{program_list}",
+            'outputContexts': [
+                {
+                    'name': context_name(session, 'awaiting-program'),
+                    'lifespanCount': 5,
+                    'parameters': {
+                        'day_query': day_query,
+                        'year_level': year_level
+                    }
+                }
+            ]
+        })
+    years = validator.years(program)
+    if year_level not in years:
+        year_list = ", ".join(str(year) for year in years)
+        return deflect('unknown_year', ask_for_year(
+            program, day_query, session,
+            f"I don't have a timetable for year {year_level} of {program}. 🎓\n\nWhich year are you in? (Available: {year_list})"
+        ))
+    if not validator.teaching_days(program, year_level).intersection(days):
+        if len(days) > 1:
+            text = format_days_response({}, days)
+        else:
+            text = format_lectures_response([], program, year_level, days[0])
+        return deflect('no_lectures', {'fulfillmentText': text})
+    return None
+
+def handle_schedule_query(parameters, session):
     """
     Main handler for schedule queries
     Manages conversation flow and context
@@ -74,49 +547,86 @@ def handle_schedule_query(parameters, contexts):
     year_level = parameters.get('year_level')
     day_query = parameters.get('day_query', 'today')  # Default to 'today'
     
+    # Fill in what a returning student told us before
+    if session_store is not None and (not program or not year_level):
+        profile = session_store.get(session)
+        if profile:
+            # A newly given program makes the remembered year level meaningless
+            if not program:
+                program = profile.get('program')
+                year_level = year_level or profile.get('year_level')
+            elif program.strip().lower() == str(profile.get('program', '')).strip().lower():
+                year_level = year_level or profile.get('year_level')
+    
     # Check if we have all required information
-    if not program and not year_level:
-        # Ask for program first
+    if not program:
+        # Ask for program first, keeping a year level given already
+        awaiting = {'day_query': day_query}
+        if year_level:
+            awaiting['year_level'] = year_level
         return {
             'fulfillmentText': "I'd be happy to show you your lecture schedule! 📅\n\nFirst, what program are you studying? (e.g., Computer Science, Software Engineering, Information Technology)",
             'outputContexts': [
                 {
-                    'name': f"{contexts[0]['name'].split('/contexts/')[0]}/contexts/awaiting-program",
+                    'name': context_name(session, 'awaiting-program'),
                     'lifespanCount': 5,
-                    'parameters': {
-                        'day_query': day_query
-                    }
+                    'parameters': awaiting
                 }
             ]
         }
     
-    elif program and not year_level:
+    elif not year_level:
         # We have program, ask for year
-        return {
-            'fulfillmentText': f"Great! You're studying {program}. 🎓\n\nWhat year level are you in? (1st, 2nd, 3rd, or 4th year)",
-            'outputContexts': [
-                {
-                    'name': f"{contexts[0]['name'].split('/contexts/')[0]}/contexts/awaiting-year",
-                    'lifespanCount': 5,
-                    'parameters': {
-                        'program': program,
-                        'day_query': day_query
-                    }
-                }
-            ]
-        }
+        return ask_for_year(
+            program, day_query, session,
+            f"Great! You're studying {program}. 🎓\n\nWhat year level are you in? (1st, 2nd, 3rd, or 4th year)"
+        )
     
     else:
-        # We have both program and year - fetch lectures
-        weekday = db.get_day_name(day_query)
-        lectures = db.get_lectures_by_day(program, int(year_level), weekday)
-        response_text = format_lectures_response(lectures, program, year_level, weekday)
+        # We have both program and year - check them, then fetch lectures
+        days = db.get_day_names(day_query)
+        given_year, year_level = year_level, parse_year_level(year_level)
+        rejected = validate_schedule(program, year_level, given_year, days, day_query, session)
+        if rejected is not None:
+            return rejected
+        if session_store is not None:
+            session_store.remember(session, program=program, year_level=year_level)
         
-        return {
-            'fulfillmentText': response_text
-        }
+        version = schedule_version()
+        if len(days) > 1:
+            # Whole week or a range of days: one lookup, answer split per day
+            key = ('schedule', program.strip().lower(), year_level, tuple(days))
+            if known_empty(key, version):
+                return deflect('known_empty', {'fulfillmentText': format_days_response({}, days)})
+            
+            def render_days():
+                lectures_by_day = get_lectures_for_days(program, year_level, days)
+                if not any(lectures_by_day.get(day) for day in days):
+                    remember_empty(key, version, 'no_lectures')
+                with metrics.phase('format'):
+                    return {
+                        'fulfillmentText': format_days_response(lectures_by_day, days)
+                    }
+            
+            return answer(key, version, render_days)
+        
+        weekday = days[0]
+        key = ('schedule', program.strip().lower(), year_level, weekday)
+        if known_empty(key, version):
+            return deflect('known_empty', {'fulfillmentText': format_lectures_response([], program, year_level, weekday)})
+        
+        def render():
+            lectures = get_lectures(program, year_level, weekday)
+            if not lectures:
+                remember_empty(key, version, 'no_lectures')
+            with metrics.phase('format'):
+                return {
+                    'fulfillmentText': format_lectures_response(lectures, program, year_level, weekday)
+                }
+        
+        return answer(key, version, render)
 
-def handle_resources_query(parameters, contexts):
+def handle_resources_query(parameters, session):
     """
     Handler for course resources queries
     Manages conversation flow for getting lecture notes
@@ -124,152 +634,351 @@ def handle_resources_query(parameters, contexts):
     course_name = parameters.get('course_name')
     week_number = parameters.get('week_number')
     
-    # Normalize course names
-    course_mapping = {
-        'distributed': 'Distributed and Cloud System Programming',
-        'cloud': 'Distributed and Cloud System Programming',
-        'database': 'Databases',
-        'databases': 'Databases',
-        'forensics': 'Digital Forensics',
-        'digital forensics': 'Digital Forensics',
-        'dcsp': 'Distributed and Cloud System Programming',
-        'db': 'Databases',
-        'df': 'Digital Forensics'
-    }
-    
+    # Resolve free text ('db', 'forensics notes', typos) to a canonical course
+    course = None
     if course_name:
-        course_lower = course_name.lower()
-        for key, value in course_mapping.items():
-            if key in course_lower:
-                course_name = value
-                break
+        # Text that matched nothing recently isn't matched again
+        unknown_key = ('course', normalize(course_name))
+        if known_empty(unknown_key, course_resolver.loaded_at):
+            matches = []
+        else:
+            matches = course_resolver.resolve(course_name)
+            if not matches:
+                remember_empty(unknown_key, course_resolver.loaded_at, 'unknown_course')
+        if len(matches) == 1:
+            course = matches[0]
+        else:
+            if matches:
+                prompt = f"I found more than one course matching '{course_name}'. Which one did you mean?"
+            else:
+                prompt = f"Sorry, I couldn't find a course called '{course_name}'. 📚\n\nWhich course are you looking for?"
+                matches = course_resolver.courses()
+            course_list = "\n".join([f"• {match['course_name']}" for match in matches])
+            return {
+                'fulfillmentText': f"{prompt}\n\n{course_list}",
+                'outputContexts': [
+                    {
+                        'name': context_name(session, 'awaiting-course'),
+                        'lifespanCount': 5,
+                        'parameters': {}
+                    }
+                ]
+            }
     
     # Check if we have course name
-    if not course_name:
-        courses = db.get_all_courses()
+    if not course:
+        courses = course_resolver.courses()
         course_list = "\n".join([f"• {course['course_name']}" for course in courses])
         
         return {
             'fulfillmentText': f"I can help you find lecture notes! \n\nWhich course are you looking for?\n\n{course_list}",
             'outputContexts': [
                 {
-                    'name': f"{contexts[0]['name'].split('/contexts/')[0]}/contexts/awaiting-course" if contexts else "awaiting-course",
+                    'name': context_name(session, 'awaiting-course'),
                     'lifespanCount': 5,
                     'parameters': {}
                 }
             ]
         }
     
-    # Check if we have week number
-    if not week_number:
-        weeks = db.get_weeks_for_course(course_name)
+    course_code = course['course_code']
+    course_name = course['course_name']
+    
+    # Weeks with materials, when known without a query (None otherwise)
+    weeks = validator.weeks(course_code) if validator is not None else None
+    if weeks == ():
+        return deflect('no_resources', {'fulfillmentText': format_resources_response([], course_name)})
+    
+    # Check if we have week number ('all weeks' skips the question)
+    if not week_number and not parameters.get('all_weeks'):
+        if weeks is None:
+            weeks = with_deadline(db.get_weeks_for_course, course_code)
+        else:
+            validator.deflect('week_list')
         if weeks:
-            week_list = ", ".join([f"Week {w}" for w in weeks])
+            return ask_for_week(course_name, weeks, session, f"Which week's materials do you need for {course_name}?")
+    
+    if not week_number:
+        return resources_page(course_code, course_name)
+    
+    try:
+        week_number = int(float(week_number))
+    except (TypeError, ValueError):
+        week_number = None
+    if week_number is None:
+        prompt = f"Sorry, I didn't catch which week you need for {course_name}."
+        if weeks is None:
+            return ask_for_week(course_name, with_deadline(db.get_weeks_for_course, course_code), session, prompt)
+        return deflect('bad_week', ask_for_week(course_name, weeks, session, prompt))
+    if weeks is not None and week_number not in weeks:
+        prompt = f"There are no materials for {course_name} - Week {week_number}. 📚\n\nWhich week do you need?"
+        return deflect('unknown_week', ask_for_week(course_name, weeks, session, prompt))
+    
+    # Fetch and return resources
+    version = resources_version()
+    key = ('resources', course_code, week_number)
+    if known_empty(key, version):
+        return deflect('known_empty', {'fulfillmentText': format_resources_response([], course_name, week_number)})
+    
+    def render():
+        resources = db.get_course_resources(course_code, week_number)
+        if not resources:
+            remember_empty(key, version, 'no_resources')
+        with metrics.phase('format'):
             return {
-                'fulfillmentText': f"Which week's materials do you need for {course_name}?\n\nAvailable: {week_list}\n\nOr say 'all weeks' to see everything.",
-                'outputContexts': [
-                    {
-                        'name': f"{contexts[0]['name'].split('/contexts/')[0]}/contexts/awaiting-week" if contexts else "awaiting-week",
-                        'lifespanCount': 5,
-                        'parameters': {
-                            'course_name': course_name
-                        }
-                    }
-                ]
+                'fulfillmentText': format_resources_response(resources, course_name, week_number)
             }
     
-    # Fetch and return resources
-    resources = db.get_course_resources(course_name, week_number)
-    response_text = format_resources_response(resources, course_name, week_number)
+    return answer(key, version, render)
+
+def precompute_answers():
+    """
+    Render today's and tomorrow's schedule for every program and year,
+    plus every course's resources, for the precompute job
+    
+    Returns:
+        list: (cache key, data version, payload) tuples
+    """
+    entries = []
+    version = schedule_version()
+    days = list(dict.fromkeys(db.get_day_names('today') + db.get_day_names('tomorrow')))
+    program_years = timetable.program_years() if timetable is not None else None
+    if program_years is None:
+        program_years = [(row['program'], row['year_level']) for row in db.get_program_years()]
+    for program, year_level in program_years:
+        lectures_by_day = get_lectures_for_days(program, year_level, days)
+        for weekday in days:
+            key = ('schedule', program.strip().lower(), int(year_level), weekday)
+            text = format_lectures_response(lectures_by_day.get(weekday), program, year_level, weekday)
+            entries.append((key, version, {'fulfillmentText': text}))
+    
+    version = resources_version()
+    for course in course_resolver.courses():
+        course_code, course_name = course['course_code'], course['course_name']
+        resources = db.get_course_resources(course_code)
+        payload = resources_page_payload(course_code, course_name, resources[:RESOURCES_PAGE_SIZE + 1])
+        entries.append((('resources', course_code, None, None), version, payload))
+        by_week = {}
+        for resource in resources:
+            by_week.setdefault(resource['week_number'], []).append(resource)
+        for week_number, week_resources in by_week.items():
+            text = format_resources_response(week_resources, course_name, week_number)
+            entries.append((('resources', course_code, week_number), version, {'fulfillmentText': text}))
+    return entries
+
+# Optional daily job keeping the morning's answers warm
+precomputer = None
+if env_flag('PRECOMPUTE'):
+    precomputer = Precomputer(
+        precompute_answers,
+        response_cache,
+        times=os.getenv('PRECOMPUTE_AT', '07:30'),
+        timezone=TIMEZONE,
+        ttl=float(os.getenv('PRECOMPUTE_TTL', 7200))
+    )
+
+def cached(key_for, version):
+    """
+    Middleware serving a handler's answer through the response cache
     
+    Args:
+        key_for (callable): Cache key for a request, or None to skip the cache
+        version (callable): Current data version of the answer
+    """
+    def hook(request, call_next):
+        key = key_for(request)
+        if key is None:
+            return call_next(request)
+        return answer(key, version(), lambda: call_next(request))
+    return hook
+
+# Intent/action -> handler; every handler is timed per handler name
+intents = IntentRegistry(middleware=[timed])
+
+@intents.register('Schedule.Query', 'Schedule.Query.Complete', actions=('query.schedule', 'query.complete'))
+def schedule_query(req):
+    return handle_schedule_query(req.parameters, req.session)
+
+@intents.register('Schedule.Query.ProvideProgram', actions=('provide.program',))
+def provide_program(req):
+    # Keep the day (and any year level) given in the first turn
+    awaiting = req.context('awaiting-program')
+    req.parameters['day_query'] = awaiting.get('day_query', 'today')
+    req.parameters['year_level'] = req.parameters.get('year_level') or awaiting.get('year_level')
+    return handle_schedule_query(req.parameters, req.session)
+
+@intents.register('Schedule.Query.ProvideYear', actions=('provide.year',))
+def provide_year(req):
+    awaiting = req.context('awaiting-year')
+    req.parameters['program'] = awaiting.get('program')
+    req.parameters['day_query'] = awaiting.get('day_query', 'today')
+    return handle_schedule_query(req.parameters, req.session)
+
+@intents.register('Resources.Query', actions=('query.resources',))
+def resources_query(req):
+    return handle_resources_query(req.parameters, req.session)
+
+@intents.register('Resources.ProvideCourse', actions=('provide.course',))
+def provide_course(req):
+    req.parameters.update(req.context('awaiting-course'))
+    return handle_resources_query(req.parameters, req.session)
+
+@intents.register('Resources.ProvideWeek', actions=('provide.week',))
+def provide_week(req):
+    req.parameters['course_name'] = req.context('awaiting-week').get('course_name')
+    # "All weeks" matches this intent without a week number
+    req.parameters['all_weeks'] = not req.parameters.get('week_number')
+    return handle_resources_query(req.parameters, req.session)
+
+def next_page_key(req):
+    """Cache key of the page a 'more' request continues with, or None if there is none"""
+    more = req.context('resources-more')
+    if not more.get('course_code') or decode_page_cursor(more.get('cursor')) is None:
+        return None
+    return ('resources', more['course_code'], None, more['cursor'])
+
+@intents.register('Resources.More', actions=('resources.more',), middleware=[cached(next_page_key, resources_version)])
+def more_resources(req):
+    """Continue an 'all weeks' answer from the token in the resources-more context"""
+    if next_page_key(req) is None:
+        return {
+            'fulfillmentText': "There's nothing more to show right now. 📚\n\nAsk me for lecture notes for a course, e.g. 'Show me lecture notes for Databases'."
+        }
+    more = req.context('resources-more')
+    return render_resources_page(more['course_code'], more.get('course_name', more['course_code']), more['cursor'])
+
+@intents.fallback
+def unknown_intent(req):
     return {
-        'fulfillmentText': response_text
+        'fulfillmentText': "I'm here to help with your lecture schedule and course materials! Just ask me 'What are my lectures today?' or 'Show me lecture notes for Databases week 3'"
     }
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Main webhook endpoint for Dialogflow"""
+    started = time.monotonic()
+    g.deadline = started + TIME_BUDGET
+    g.outcome = 'fresh'
+    intent_name = action = None
     try:
-        req = request.get_json(force=True)
+        with metrics.phase('parse'):
+            body = request.get_json(force=True)
         
         # Extract data from Dialogflow request
-        intent_name = req.get('queryResult').get('intent').get('displayName')
-        parameters = req.get('queryResult').get('parameters')
-        contexts = req.get('queryResult').get('outputContexts', [])
-        action = req.get('queryResult').get('action')
+        with metrics.phase('context'):
+            req = DialogflowRequest.parse(body)
+        intent_name, action = req.intent, req.action
         
-        print(f"Intent: {intent_name}")
-        print(f"Action: {action}")
-        print(f"Parameters: {parameters}")
-        
-        # Route to appropriate handler based on intent/action
-        if intent_name == 'Schedule.Query' or action == 'query.schedule':
-            response = handle_schedule_query(parameters, contexts)
-        
-        elif intent_name == 'Schedule.Query.ProvideProgram' or action == 'provide.program':
-            # Get day_query from context if exists
-            day_query = 'today'
-            for context in contexts:
-                if 'awaiting-program' in context.get('name', ''):
-                    day_query = context.get('parameters', {}).get('day_query', 'today')
-            
-            parameters['day_query'] = day_query
-            response = handle_schedule_query(parameters, contexts)
-        
-        elif intent_name == 'Schedule.Query.ProvideYear' or action == 'provide.year':
-            # Get program and day_query from context
-            program = None
-            day_query = 'today'
-            
-            for context in contexts:
-                if 'awaiting-year' in context.get('name', ''):
-                    program = context.get('parameters', {}).get('program')
-                    day_query = context.get('parameters', {}).get('day_query', 'today')
-            
-            parameters['program'] = program
-            parameters['day_query'] = day_query
-            response = handle_schedule_query(parameters, contexts)
+        logger.debug("Webhook parameters", extra={'fields': {'intent': intent_name, 'parameters': req.parameters}})
+        if not req.session:
+            logger.warning("Webhook request without a session; replying without output contexts",
+                           extra={'fields': {'intent': intent_name}})
         
-        elif intent_name == 'Schedule.Query.Complete' or action == 'query.complete':
-            response = handle_schedule_query(parameters, contexts)
-        
-        elif intent_name == 'Resources.Query' or action == 'query.resources':
-            response = handle_resources_query(parameters, contexts)
-        
-        elif intent_name == 'Resources.ProvideCourse' or action == 'provide.course':
-            # Get context parameters
-            for context in contexts:
-                if 'awaiting-course' in context.get('name', ''):
-                    parameters.update(context.get('parameters', {}))
-            response = handle_resources_query(parameters, contexts)
-        
-        elif intent_name == 'Resources.ProvideWeek' or action == 'provide.week':
-            # Get course from context
-            course_name = None
-            for context in contexts:
-                if 'awaiting-week' in context.get('name', ''):
-                    course_name = context.get('parameters', {}).get('course_name')
-            
-            parameters['course_name'] = course_name
-            response = handle_resources_query(parameters, contexts)
-        
-        else:
-            response = {
-                'fulfillmentText': "I'm here to help with your lecture schedule and course materials! Just ask me 'What are my lectures today?' or 'Show me lecture notes for Databases week 3'"
-            }
-        
-        return jsonify(response)
+        response = bind_session(intents.dispatch(req), req.session)
+        if isinstance(response, bytes):
+            # Pre-serialized answer from the response cache
+            return app.response_class(response, mimetype='application/json')
+        with metrics.phase('serialize'):
+            return jsonify(response)
+    
+    except TimeoutError as e:
+        g.outcome = 'failed'
+        metrics.increment('webhook_errors_total', intent=intent_name or 'unknown', type='timeout')
+        logger.warning("Webhook deadline exceeded: %s", e, extra={'fields': {'intent': intent_name}})
+        return jsonify({
+            'fulfillmentText': "Sorry, that's taking longer than usual. Please try again in a moment."
+        })
     
     except Exception as e:
-        print(f"Error in webhook: {e}")
+        g.outcome = 'failed'
+        metrics.increment('webhook_errors_total', intent=intent_name or 'unknown', type=type(e).__name__)
+        logger.exception("Error in webhook: %s", e, extra={'fields': {'intent': intent_name}})
         return jsonify({
             'fulfillmentText': "Sorry, I encountered an error. Please try again."
         })
+    
+    finally:
+        elapsed = time.monotonic() - started
+        metrics.observe('webhook_request_seconds', elapsed, intent=intent_name or 'unknown', outcome=g.outcome)
+        logger.info("Webhook request", extra={'fields': {
+            'intent': intent_name,
+            'action': action,
+            'outcome': g.outcome,
+            'duration_ms': round(elapsed * 1000, 3)
+        }})
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Webhook is running'})
+    """Health check endpoint (503 until the worker has warmed up)"""
+    worker = {
+        'pid': os.getpid(),
+        'warmup_seconds': warmup_seconds,
+        'rss_bytes': resident_memory_bytes()
+    }
+    if not ready.is_set():
+        return jsonify({'status': 'starting', 'message': 'Webhook is warming up', 'worker': worker}), 503
+    
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Webhook is running',
+        'worker': worker,
+        'pool': db.pool_stats(),
+        'db_queries': db.queries,
+        'timetable': timetable.stats() if timetable else None,
+        'response_cache': response_cache.stats(),
+        'singleflight': {
+            'db': db.flight.stats(),
+            'render': response_cache.flight.stats()
+        },
+        'sessions': session_store.stats() if session_store else None,
+        'precompute': precomputer.stats() if precomputer else None,
+        'change_feed': change_feed.stats() if change_feed else None,
+        'validation': dict(validator.stats(), negative_cache=negative_cache.stats()) if validator else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics: per-intent and per-phase latency histograms, error counters and cache/pool gauges"""
+    gauges = {
+        'db_queries_total': db.queries,
+        'worker_ready': int(ready.is_set()),
+        'worker_warmup_seconds': warmup_seconds or 0,
+        'process_resident_memory_bytes': resident_memory_bytes() or 0
+    }
+    gauges.update(flatten('db_pool', db.pool_stats()))
+    gauges.update(flatten('response_cache', response_cache.stats()))
+    gauges.update(flatten('singleflight_db', db.flight.stats()))
+    gauges.update(flatten('singleflight_render', response_cache.flight.stats()))
+    if timetable is not None:
+        gauges.update(flatten('timetable', timetable.stats()))
+    if session_store is not None:
+        gauges.update(flatten('session_store', session_store.stats()))
+    if precomputer is not None:
+        gauges.update(flatten('precompute', precomputer.stats()))
+    if change_feed is not None:
+        gauges.update(flatten('change_feed', change_feed.stats()))
+    if validator is not None:
+        gauges.update(flatten('validation', validator.stats()))
+        gauges.update(flatten('negative_cache', negative_cache.stats()))
+    return app.response_class(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/timetable/refresh', methods=['POST'])
+def refresh_timetable():
+    """
+    Reload the in-memory timetable index on demand (requires ADMIN_TOKEN)
+    
+    Only the worker process that receives the request is refreshed; the
+    others pick up changes on their next TIMETABLE_REFRESH_SECONDS reload.
+    """
+    token = os.getenv('ADMIN_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return jsonify({'error': 'unauthorized'}), 401
+    if timetable is None:
+        return jsonify({'error': 'timetable index is disabled'}), 404
+    
+    refreshed = timetable.refresh()
+    return jsonify({'refreshed': refreshed, 'timetable': timetable.stats()}), (200 if refreshed else 503)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -279,14 +988,15 @@ def home():
         'status': 'running',
         'endpoints': {
             'webhook': '/webhook',
-            'health': '/health'
+            'health': '/health',
+            'metrics': '/metrics'
         }
     })
 
 if __name__ == '__main__':
-    # Connect to database on startup
-    db.connect()
+    # Development server; in production use: gunicorn -c gunicorn.conf.py wsgi:app
+    create_app(preload=False)
     
     # Run Flask app
     port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=env_flag('FLASK_DEBUG'))
\ No newline at end of file